@@ -0,0 +1,81 @@
+"""Compare sequential and per-timestamp seek frame extraction on a synthetic video.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_frame_extraction --duration 600 --timestamps 20
+
+Seeking in a local file is cheap, so the gap between the modes is much wider
+on remote streams; pass ``--video`` with a resolved stream URL to measure one.
+"""
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import cv2
+import numpy as np
+from utils.extract_images import extract_frames_python
+
+
+def make_synthetic_video(path, duration, fps=30, width=640, height=360):
+    """Write an MP4 whose frames each carry their frame number."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for frame_number in range(int(duration * fps)):
+        frame = np.roll(background, frame_number * 4, axis=1)
+        cv2.putText(frame, str(frame_number), (20, height // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+
+
+def random_timestamps(duration, count, seed=0):
+    rng = random.Random(seed)
+    seconds = rng.sample(range(int(duration)), min(count, int(duration)))
+    return [
+        (f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}", f"frame_{s:05d}.png")
+        for s in seconds
+    ]
+
+
+def time_mode(video_path, timestamps, mode, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        output_dir = tempfile.mkdtemp(prefix=f"bench_{mode}_")
+        try:
+            start = time.perf_counter()
+            frames = extract_frames_python(video_path, timestamps, output_dir, mode=mode)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            shutil.rmtree(output_dir)
+    return best, len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=int, default=300, help="video length in seconds")
+    parser.add_argument("--timestamps", type=int, default=20, help="frames to extract")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--video", help="existing video file or stream URL to use instead")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_video_")
+    try:
+        video_path = args.video
+        if video_path is None:
+            video_path = os.path.join(workdir, "synthetic.mp4")
+            make_synthetic_video(video_path, args.duration)
+        timestamps = random_timestamps(args.duration, args.timestamps)
+
+        print(f"{args.duration}s video, {len(timestamps)} timestamps (best of {args.repeat})")
+        for mode in ("seek", "sequential"):
+            elapsed, extracted = time_mode(video_path, timestamps, mode, args.repeat)
+            print(f"  {mode:<10} {elapsed * 1000:9.1f} ms  {extracted} frames")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
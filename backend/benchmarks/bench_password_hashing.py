@@ -0,0 +1,50 @@
+"""Measure password verification throughput at several concurrency levels.
+
+Compares verifying inline on the event loop (the old login path) with the
+bounded bcrypt pool in ``utils.hashing``:
+
+    python -m benchmarks.bench_password_hashing --rounds 10 12 --concurrency 1 8 32
+"""
+import time
+import asyncio
+import argparse
+from utils.hashing import hash_password, check_password, check_password_async
+
+PASSWORD = "Benchmark#123"
+
+
+async def run_level(hashed, concurrency, total, offload):
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            if offload:
+                await check_password_async(PASSWORD, hashed)
+            else:
+                check_password(PASSWORD, hashed)
+            # Yield like a request handler would between awaits
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'conc':>5} {'inline/s':>9} {'pool/s':>9}")
+    for rounds in args.rounds:
+        hashed = hash_password(PASSWORD, rounds)
+        for concurrency in args.concurrency:
+            inline = await run_level(hashed, concurrency, args.requests, offload=False)
+            pooled = await run_level(hashed, concurrency, args.requests, offload=True)
+            print(f"{rounds:>6} {concurrency:>5} {inline:>9.1f} {pooled:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,200 @@
+"""Time the processing pipeline offline, stage by stage and end to end.
+
+YouTube, Gemini, yt-dlp and Resend are replaced by ``benchmarks.fakes`` and
+videos are synthetic MP4s, so results only reflect this code. Run from the
+backend directory:
+
+    python -m benchmarks.bench_pipeline --durations 60 600 --resolutions 640x360 1280x720 \\
+        --output bench.json
+
+Caches are bypassed so every repeat does the full work. Compare the JSON of
+two commits with ``--baseline old.json``.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+from benchmarks import fakes
+
+fakes.install()
+
+from benchmarks.bench_frame_extraction import make_synthetic_video, random_timestamps
+from utils import llm
+from utils.cache import cache_bypass
+from utils.frame_store import frame_store
+from utils.extract_images import parse_transcript, extract_frames_python
+from utils.transcribe import format_transcript, analyze_visual_segments
+from routers.process_routes import FullProcessingRequest, process_video_fully
+
+
+async def measure(fn, repeat):
+    """Run ``fn`` (sync or returning a coroutine) ``repeat`` times; timings in ms."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        if asyncio.iscoroutine(result):
+            await result
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(name, params, timings):
+    return {
+        "name": name,
+        "params": params,
+        "runs": len(timings),
+        "best_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def highlights_text(count, duration):
+    step = max(1, int(duration) // max(count, 1))
+    return "\n".join(
+        f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d} - visual - Slide {i} with a diagram"
+        for i, s in enumerate(range(0, step * count, step))
+    )
+
+
+async def bench_video(video_path, duration, resolution, args, workdir):
+    results = []
+    params = {"duration": duration, "resolution": resolution}
+    fakes.config.video_path = video_path
+    fakes.config.transcript_seconds = duration
+
+    text = highlights_text(args.highlights, duration)
+    results.append(summarize(
+        "parse_transcript", {**params, "highlights": args.highlights},
+        await measure(lambda: parse_transcript(text), args.repeat * 10),
+    ))
+
+    timestamps = random_timestamps(duration, args.highlights)
+    for mode in ("sequential", "seek"):
+        def extract():
+            output_dir = tempfile.mkdtemp(dir=workdir)
+            extract_frames_python(video_path, timestamps, output_dir, mode=mode)
+            shutil.rmtree(output_dir)
+        results.append(summarize(
+            "extract_frames_python", {**params, "mode": mode, "timestamps": len(timestamps)},
+            await measure(extract, args.repeat),
+        ))
+
+    transcript = fakes.make_transcript(duration)
+    results.append(summarize(
+        "format_transcript", {**params, "segments": len(transcript)},
+        await measure(lambda: format_transcript(transcript), args.repeat),
+    ))
+    foreign = fakes.make_transcript(duration, "es")
+    results.append(summarize(
+        "format_transcript", {**params, "segments": len(foreign), "translate": True},
+        await measure(lambda: format_transcript(foreign, True, "es"), args.repeat),
+    ))
+
+    formatted = await format_transcript(transcript)
+    results.append(summarize(
+        "analyze_visual_segments", {**params, "chars": len(formatted)},
+        await measure(lambda: analyze_visual_segments(formatted), args.repeat),
+    ))
+
+    request = FullProcessingRequest(video_url="https://www.youtube.com/watch?v=benchVideo0")
+
+    def process():
+        # A fresh frame store per run, otherwise repeats reuse stored frames
+        frame_store.root = tempfile.mkdtemp(dir=workdir)
+        return process_video_fully(request)
+    results.append(summarize(
+        "process_video_fully", params, await measure(process, args.repeat),
+    ))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (r["name"], json.dumps(r["params"], sort_keys=True)): r for r in json.load(f)["results"]
+        }
+    print(f"\nAgainst {baseline_path}:")
+    for result in results:
+        old = baseline.get((result["name"], json.dumps(result["params"], sort_keys=True)))
+        if old:
+            change = (result["median_ms"] - old["median_ms"]) / old["median_ms"] * 100 if old["median_ms"] else 0.0
+            print(f"  {result['name']:<24} {json.dumps(result['params'])}  {change:+6.1f}%")
+
+
+async def bench_all(args, workdir):
+    # One event loop for every measurement, with caches bypassed throughout
+    cache_bypass.set(True)
+    results = []
+    for resolution in args.resolutions:
+        width, height = (int(n) for n in resolution.split("x"))
+        for duration in args.durations:
+            video_path = os.path.join(workdir, f"synthetic_{duration}s_{resolution}.mp4")
+            make_synthetic_video(video_path, duration, width=width, height=height)
+            results.extend(await bench_video(video_path, duration, resolution, args, workdir))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--durations", type=int, nargs="+", default=[60, 600], help="video lengths in seconds")
+    parser.add_argument("--resolutions", nargs="+", default=["640x360"], help="WIDTHxHEIGHT of synthetic videos")
+    parser.add_argument("--highlights", type=int, default=20, help="timestamps per video")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="simulated Gemini latency")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier JSON output to compare against")
+    args = parser.parse_args()
+    fakes.config.llm_latency_ms = args.llm_latency_ms
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    cwd = os.getcwd()
+    try:
+        # The pipeline writes research_documents/ relative to the working directory
+        os.chdir(workdir)
+        results = asyncio.run(bench_all(args, workdir))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+    for result in results:
+        print(f"{result['name']:<24} {json.dumps(result['params']):<70} "
+              f"median {result['median_ms']:10.2f} ms  best {result['best_ms']:10.2f} ms")
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.time(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": vars(args),
+        "llm": dict(llm.stats),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
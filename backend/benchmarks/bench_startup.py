@@ -0,0 +1,134 @@
+"""Measure cold start: importing ``main`` and time until the server answers.
+
+Each run is a fresh interpreter, so nothing is cached between runs except
+the OS page cache. Run from the backend directory:
+
+    python -m benchmarks.bench_startup --repeat 5 --output startup.json
+
+``--baseline`` compares with an earlier ``--output``; ``--top`` lists the
+slowest imports from ``python -X importtime``.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import httpx
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def time_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_ready(timeout):
+    """Seconds from spawning uvicorn until ``GET /`` succeeds."""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                time.sleep(0.01)
+        raise RuntimeError("Server did not become ready in time")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def slowest_imports(count):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], capture_output=True, text=True
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Only top-level packages, nested imports are counted in their parents
+        if "." not in name:
+            modules.append((int(cumulative) / 1000, name))
+    return sorted(modules, reverse=True)[:count]
+
+
+def summarize(name, timings):
+    return {
+        "name": name,
+        "runs": len(timings),
+        "best_ms": round(min(timings) * 1000, 1),
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "max_ms": round(max(timings) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for readiness")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier JSON output to compare against")
+    args = parser.parse_args()
+
+    results = [
+        summarize("import_main", [time_import() for _ in range(args.repeat)]),
+        summarize("ready_to_serve", [time_ready(args.timeout) for _ in range(args.repeat)]),
+    ]
+    for result in results:
+        print(f"{result['name']:<16} median {result['median_ms']:8.1f} ms  best {result['best_ms']:8.1f} ms")
+
+    imports = slowest_imports(args.top)
+    if imports:
+        print("\nSlowest imports (cumulative):")
+        for ms, name in imports:
+            print(f"  {ms:8.1f} ms  {name}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {r["name"]: r for r in json.load(f)["results"]}
+        print(f"\nAgainst {args.baseline}:")
+        for result in results:
+            old = baseline.get(result["name"])
+            if old and old["median_ms"]:
+                change = (result["median_ms"] - old["median_ms"]) / old["median_ms"] * 100
+                print(f"  {result['name']:<16} {change:+6.1f}%")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": time.time(),
+                "python": sys.version.split()[0],
+                "cwd": os.getcwd(),
+                "results": results,
+                "slowest_imports": [{"module": name, "cumulative_ms": ms} for ms, name in imports],
+            }, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
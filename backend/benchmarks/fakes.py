@@ -0,0 +1,207 @@
+"""Offline stand-ins for the external services the pipeline talks to.
+
+``install()`` must run before the app modules are imported: it registers
+fake ``google.generativeai`` and ``resend`` modules, then patches
+``YouTubeTranscriptApi``, ``YoutubeDL`` and the Mongo user collection where
+the app looks them up.
+Behaviour is driven by ``config``, which benchmarks may change between runs.
+"""
+import os
+import sys
+import time
+import types
+import zlib
+from types import SimpleNamespace
+
+config = SimpleNamespace(
+    # Local file or URL returned as the stream URL of every video
+    video_path=None,
+    # Length of the generated transcript, one segment every 5 seconds
+    transcript_seconds=600,
+    # Language of the only transcript; anything but "en" goes through translation
+    transcript_language="en",
+    transcript_latency_ms=0,
+    llm_latency_ms=0,
+    ytdlp_latency_ms=0,
+)
+
+sent_emails = []
+
+
+def _sleep(ms):
+    if ms:
+        time.sleep(ms / 1000)
+
+
+def make_transcript(seconds, language="en"):
+    return [
+        {"start": float(start), "duration": 5.0, "text": f"[{language}] segment {start // 5} about topic {start // 60}"}
+        for start in range(0, int(seconds), 5)
+    ]
+
+
+class FakeTranscript:
+    def __init__(self, video_id, language_code):
+        self.video_id = video_id
+        self.language_code = language_code
+
+    def fetch(self):
+        _sleep(config.transcript_latency_ms)
+        return make_transcript(config.transcript_seconds, self.language_code)
+
+
+class FakeTranscriptList:
+    def __init__(self, video_id):
+        self.video_id = video_id
+        transcript = FakeTranscript(video_id, config.transcript_language)
+        self._manually_created_transcripts = {config.transcript_language: transcript}
+        self._generated_transcripts = {}
+
+    def find_transcript(self, language_codes):
+        from youtube_transcript_api import NoTranscriptFound
+
+        for code in language_codes:
+            if code in self._manually_created_transcripts:
+                return self._manually_created_transcripts[code]
+        raise NoTranscriptFound(self.video_id, language_codes, [])
+
+
+class FakeYouTubeTranscriptApi:
+    @staticmethod
+    def list_transcripts(video_id):
+        return FakeTranscriptList(video_id)
+
+
+class FakeYoutubeDL:
+    def __init__(self, options=None):
+        self.options = options or {}
+
+    def extract_info(self, url, download=False):
+        _sleep(config.ytdlp_latency_ms)
+        if url.startswith("ytsearch"):
+            count, _, query = url[len("ytsearch"):].partition(":")
+            return {"entries": [
+                {"id": f"{zlib.crc32(f'{query}#{i}'.encode()):011d}", "title": f"{query} #{i}",
+                 "view_count": 1000 * i, "upload_date": "20240101"}
+                for i in range(int(count or 1))
+            ]}
+        return {"id": url[-11:], "url": config.video_path or url, "title": "Synthetic video"}
+
+
+class FakeCollection:
+    """In-memory subset of a motor collection, enough for the auth routes."""
+
+    def __init__(self):
+        self.documents = []
+        self.unique = set()
+
+    @staticmethod
+    def _matches(document, query):
+        return all(document.get(key) == value for key, value in query.items())
+
+    @staticmethod
+    def _project(document, projection):
+        if not projection:
+            return dict(document)
+        if any(projection.values()):
+            return {key: value for key, value in document.items() if key == "_id" or projection.get(key)}
+        return {key: value for key, value in document.items() if key not in projection}
+
+    async def create_index(self, field, unique=False, **kwargs):
+        if unique:
+            self.unique.add(field)
+        return f"{field}_1"
+
+    async def find_one(self, query, projection=None, *args, **kwargs):
+        for document in self.documents:
+            if self._matches(document, query):
+                return self._project(document, projection)
+        return None
+
+    async def insert_one(self, document):
+        from bson import ObjectId
+        from pymongo.errors import DuplicateKeyError
+
+        for field in self.unique:
+            if any(existing.get(field) == document.get(field) for existing in self.documents):
+                raise DuplicateKeyError(f"Duplicate {field}")
+        document = {"_id": ObjectId(), **document}
+        self.documents.append(document)
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    async def update_one(self, query, update, *args, **kwargs):
+        for document in self.documents:
+            if self._matches(document, query):
+                document.update(update.get("$set", {}))
+                return SimpleNamespace(matched_count=1, modified_count=1)
+        return SimpleNamespace(matched_count=0, modified_count=0)
+
+
+users = FakeCollection()
+
+
+class FakeGenerativeModel:
+    """``genai.GenerativeModel`` answering like ``utils.llm.StubModel``."""
+
+    def __init__(self, model_name, **kwargs):
+        from utils.llm import StubModel
+
+        self.model_name = model_name
+        self._stub = StubModel(model_name)
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        _sleep(config.llm_latency_ms)
+        return self._stub.generate_content(prompt)
+
+
+def _fake_genai():
+    module = types.ModuleType("google.generativeai")
+    module.configure = lambda **kwargs: None
+    module.GenerativeModel = FakeGenerativeModel
+    return module
+
+
+def _fake_resend():
+    module = types.ModuleType("resend")
+    emails = types.ModuleType("resend.emails")
+
+    class Emails:
+        @staticmethod
+        def send(params):
+            sent_emails.append(params)
+            return {"id": f"fake-{len(sent_emails)}"}
+
+    module.Emails = emails.Emails = Emails
+    module.emails = emails
+    module.api_key = None
+    return module, emails
+
+
+def install(**overrides):
+    """Route the app's external calls to the fakes; returns ``config``."""
+    for key, value in overrides.items():
+        if not hasattr(config, key):
+            raise AttributeError(f"Unknown fake setting: {key}")
+        setattr(config, key, value)
+
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+    os.environ["LLM_BACKEND"] = "gemini"
+
+    google = sys.modules.get("google") or types.ModuleType("google")
+    genai = _fake_genai()
+    google.generativeai = genai
+    sys.modules.setdefault("google", google)
+    sys.modules["google.generativeai"] = genai
+
+    resend, emails = _fake_resend()
+    sys.modules["resend"] = resend
+    sys.modules["resend.emails"] = emails
+
+    from utils import db, llm, transcribe, ytdlp
+
+    db._user_collection = users
+    llm.LLM_BACKEND = "gemini"
+    llm._models.clear()
+    transcribe.YouTubeTranscriptApi = FakeYouTubeTranscriptApi
+    ytdlp.YoutubeDL = FakeYoutubeDL
+    return config
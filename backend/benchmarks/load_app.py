@@ -0,0 +1,248 @@
+"""Drive a mix of API routes concurrently against the app running on fakes.
+
+Starts ``main:app`` in a subprocess with ``benchmarks.fakes`` installed (no
+YouTube, Gemini, MongoDB or Resend needed), then reports throughput, latency
+percentiles and error rates per route. Run from the backend directory:
+
+    python -m benchmarks.load_app --concurrency 1 10 50 --requests 300 \\
+        --mix login=1 me=4 search=2 transcript=2 process=1 --output load.json
+
+Simulated service latencies (``--llm-latency-ms`` etc.) are spent in the
+fakes' blocking calls, so a handler that blocks the event loop shows up as
+latency on every other route. Pass ``--baseline`` to compare with an
+earlier ``--output``. Use ``--url`` to load an already running server.
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import httpx
+
+EMAIL = "load@example.com"
+PASSWORD = "Load#Test123"
+TOPICS = ["linear algebra", "photosynthesis", "rust ownership", "french revolution", "neural networks",
+          "plate tectonics", "jazz harmony", "graph theory", "supply and demand", "black holes"]
+VIDEO_IDS = [f"loadVideo{i:02d}" for i in range(10)]
+
+
+def serve(args):
+    """Run the app on fakes; invoked in the server subprocess."""
+    os.environ.setdefault("JWT_SECRET", "load-test-secret-not-for-production")
+
+    from benchmarks import fakes
+
+    fakes.install(
+        llm_latency_ms=args.llm_latency_ms,
+        ytdlp_latency_ms=args.ytdlp_latency_ms,
+        transcript_latency_ms=args.transcript_latency_ms,
+        transcript_seconds=args.video_seconds,
+    )
+
+    import uvicorn
+    from bson import ObjectId
+    from benchmarks.bench_frame_extraction import make_synthetic_video
+    from utils.hashing import hash_password
+
+    workdir = tempfile.mkdtemp(prefix="load_app_")
+    fakes.config.video_path = os.path.join(workdir, "synthetic.mp4")
+    make_synthetic_video(fakes.config.video_path, args.video_seconds, width=320, height=180)
+    fakes.users.documents.append({
+        "_id": ObjectId(),
+        "name": "Load Test",
+        "email": EMAIL,
+        "password": hash_password(PASSWORD),
+        "is_verified": True,
+    })
+    os.chdir(workdir)
+
+    from main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def request_factories(token, cache_bypass):
+    headers = {"Authorization": f"Bearer {token}"}
+    if cache_bypass:
+        headers["X-Cache-Bypass"] = "1"
+
+    def video_url():
+        return f"https://www.youtube.com/watch?v={random.choice(VIDEO_IDS)}"
+
+    return {
+        "login": lambda: ("POST", "/auth/login", {"json": {"email": EMAIL, "password": PASSWORD}}),
+        "me": lambda: ("GET", "/auth/me", {"headers": headers}),
+        "search": lambda: ("GET", "/api/search/", {"params": {"prompt": random.choice(TOPICS)}, "headers": headers}),
+        "transcript": lambda: ("GET", "/api/transcript/", {"params": {"url": video_url()}, "headers": headers}),
+        "process": lambda: ("POST", "/api/process/full", {"json": {"video_url": video_url()}, "headers": headers}),
+    }
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_level(client, factories, weights, concurrency, total):
+    routes = list(weights)
+    samples = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            route = random.choices(routes, weights=[weights[r] for r in routes])[0]
+            method, path, kwargs = factories[route]()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                if response.status_code >= 400:
+                    errors[route] += 1
+            except httpx.HTTPError:
+                errors[route] += 1
+            samples[route].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    report = {"concurrency": concurrency, "requests": total, "elapsed_seconds": round(elapsed, 3),
+              "throughput_rps": round(total / elapsed, 2), "routes": {}}
+    for route in routes:
+        latencies = samples[route]
+        if not latencies:
+            continue
+        report["routes"][route] = {
+            "requests": len(latencies),
+            "errors": errors[route],
+            "error_rate": round(errors[route] / len(latencies), 4),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p90_ms": round(percentile(latencies, 0.90) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2),
+        }
+    return report
+
+
+async def wait_until_up(client, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            await client.get("/")
+            return
+        except httpx.HTTPError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+async def drive(args):
+    weights = {}
+    for item in args.mix:
+        route, _, weight = item.partition("=")
+        weights[route] = float(weight or 1)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+        await wait_until_up(client, args.server)
+        response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        token = response.json()["data"]["token"] if response.status_code == 200 else ""
+        factories = request_factories(token, args.cache_bypass)
+        unknown = set(weights) - set(factories)
+        if unknown:
+            raise SystemExit(f"Unknown routes in --mix: {', '.join(sorted(unknown))}")
+
+        levels = []
+        for concurrency in args.concurrency:
+            level = await run_level(client, factories, weights, concurrency, args.requests)
+            levels.append(level)
+            print(f"\nconcurrency {concurrency}: {level['throughput_rps']} req/s overall")
+            for route, stats in level["routes"].items():
+                print(f"  {route:<11} {stats['requests']:5d} req  {stats['throughput_rps']:8.2f} req/s  "
+                      f"p50 {stats['p50_ms']:9.2f} ms  p99 {stats['p99_ms']:9.2f} ms  "
+                      f"errors {stats['error_rate'] * 100:5.1f}%")
+    return levels
+
+
+def compare(levels, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {level["concurrency"]: level for level in json.load(f)["levels"]}
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+6.1f}%" if old else "   n/a"
+
+    print(f"\nAgainst {baseline_path}:")
+    for level in levels:
+        old_level = baseline.get(level["concurrency"])
+        if old_level is None:
+            continue
+        print(f"  concurrency {level['concurrency']}: throughput "
+              f"{change(level['throughput_rps'], old_level['throughput_rps'])}")
+        for route, stats in level["routes"].items():
+            old = old_level["routes"].get(route)
+            if old:
+                print(f"    {route:<11} p50 {change(stats['p50_ms'], old['p50_ms'])}  "
+                      f"p99 {change(stats['p99_ms'], old['p99_ms'])}  "
+                      f"errors {stats['error_rate'] * 100:5.1f}% (was {old['error_rate'] * 100:.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--mix", nargs="+", default=["login=1", "me=4", "search=2", "transcript=2", "process=1"],
+                        help="ROUTE=WEIGHT pairs; routes: login, me, search, transcript, process")
+    parser.add_argument("--cache-bypass", action="store_true", help="send X-Cache-Bypass on every request")
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--ytdlp-latency-ms", type=float, default=300)
+    parser.add_argument("--transcript-latency-ms", type=float, default=300)
+    parser.add_argument("--video-seconds", type=int, default=120)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="load this running server instead of starting one")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier JSON output to compare against")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    random.seed(args.seed)
+    args.server = None
+    if args.url is None:
+        args.url = f"http://127.0.0.1:{args.port}"
+        command = [sys.executable, "-m", "benchmarks.load_app", "--serve", *sys.argv[1:]]
+        args.server = subprocess.Popen(command)
+    try:
+        levels = asyncio.run(drive(args))
+    finally:
+        if args.server is not None:
+            args.server.send_signal(signal.SIGINT)
+            args.server.wait(timeout=30)
+
+    report = {
+        "created_at": time.time(),
+        "settings": {key: value for key, value in vars(args).items() if key != "server"},
+        "levels": levels,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.baseline:
+        compare(levels, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,74 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.datastructures import Headers
 
 from routers import auth_router, process_router, search_router, transcribe_router, extract_router
+from routers.process_routes import process_jobs, batch_jobs
 from models import BaseResponseModel
+from utils import db
+from utils.cache import cache_stats, cache_bypass, close_redis
+from utils.executors import executor_stats, run_blocking, shutdown_executors
+from utils import metrics
+from utils.lazy import warm_imports
+from utils.profiling import LOOP_LAG_MONITOR, ProfilingMiddleware, loop_monitor
 
-app = FastAPI()
+
+async def _ensure_indexes():
+    try:
+        await db.ensure_indexes()
+    except Exception as e:
+        logging.error(f"Could not create MongoDB indexes: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db.connect()
+    # Neither waits for startup: an unreachable Mongo would otherwise delay
+    # serving by the server selection timeout, and heavy imports run on the
+    # "warmup" executor
+    indexes = asyncio.create_task(_ensure_indexes())
+    warmup = asyncio.create_task(run_blocking("warmup", warm_imports))
+    if LOOP_LAG_MONITOR:
+        loop_monitor.start()
+    await process_jobs.start()
+    await batch_jobs.start()
+    yield
+    indexes.cancel()
+    await asyncio.gather(indexes, warmup, return_exceptions=True)
+    await loop_monitor.stop()
+    await process_jobs.stop()
+    await batch_jobs.stop()
+    db.close()
+    await close_redis()
+    shutdown_executors()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class CacheBypassMiddleware:
+    """Skip cached LLM and transcript results when X-Cache-Bypass is set.
+
+    Plain ASGI, so the endpoint and its background tasks run in the context
+    where the flag was set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and Headers(scope=scope).get("X-Cache-Bypass", "").lower() in ("1", "true"):
+            cache_bypass.set(True)
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(CacheBypassMiddleware)
+# Added last so it runs outermost and profiles the whole request
+app.add_middleware(ProfilingMiddleware)
 
 
 @app.exception_handler(RequestValidationError)
@@ -50,6 +113,30 @@ async def index():
     }
 
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "success": True,
+        "message": "Cache statistics",
+        "data": cache_stats(),
+    }
+
+
+@app.get("/executors/stats")
+async def get_executor_stats():
+    return {
+        "success": True,
+        "message": "Executor statistics",
+        "data": {**executor_stats(), "event_loop": loop_monitor.stats()},
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint; counters are only formatted when requested."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(auth_router)
 app.include_router(search_router)
 app.include_router(transcribe_router)
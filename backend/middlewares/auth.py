@@ -6,15 +6,49 @@ from bson import ObjectId
 from dotenv import load_dotenv
 
 from models.user import UserModel
-from utils.db import user_collection
+from utils.db import get_user_collection, USER_PUBLIC_PROJECTION
+from utils.cache import TieredCache, REDIS_URL
 
 load_dotenv()
 
 jwt_secret = os.getenv("JWT_SECRET")
 
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_REDIS = os.getenv("USER_CACHE_REDIS", "false").lower() == "true"
+
+# Short-lived so that other workers' in-process copies go stale quickly
+user_cache = TieredCache(
+    "user",
+    ttl=USER_CACHE_TTL,
+    max_entries=USER_CACHE_MAX_ENTRIES,
+    redis_url=REDIS_URL if USER_CACHE_REDIS else None,
+)
+
 bearer_token = HTTPBearer()
 
 
+async def get_cached_user(user_id: str):
+    """Fetch a user document without its password, via the short-TTL cache."""
+    if not ObjectId.is_valid(user_id):
+        return None
+    key = user_cache.key(user_id)
+    user_data = await user_cache.get(key)
+    if user_data is None:
+        user_data = await get_user_collection().find_one(
+            {"_id": ObjectId(user_id)}, USER_PUBLIC_PROJECTION
+        )
+        if user_data is None:
+            return None
+        await user_cache.set(key, {**user_data, "_id": user_id})
+    return {**user_data, "_id": ObjectId(user_id)}
+
+
+async def invalidate_user(user_id) -> None:
+    """Drop a cached user; call after any write to that user's document."""
+    await user_cache.delete(user_cache.key(str(user_id)))
+
+
 async def get_current_user(
     token: HTTPAuthorizationCredentials = Depends(bearer_token),
 ) -> UserModel:
@@ -36,7 +70,7 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
 
-    user_data = user_collection.find_one({"_id": ObjectId(user_id)})
+    user_data = await get_cached_user(user_id)
     if user_data is None:
         raise credentials_exception
 
@@ -46,7 +80,4 @@ async def get_current_user(
             detail="User account is not verified.",
         )
 
-    if "password" in user_data:
-        del user_data["password"]
-
     return UserModel(**user_data)
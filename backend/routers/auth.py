@@ -11,15 +11,17 @@ from models import (
     UserDetailsResponse,
     UserDetails,
 )
-from utils.hashing import hash_password, check_password
+from utils.hashing import hash_password_async, check_password_async, needs_rehash
 import os
 from dotenv import load_dotenv
 import jwt
 from utils.email import send_email
 from datetime import timezone, datetime, timedelta
 from bson import objectid
-from utils.db import user_collection
-from middlewares.auth import get_current_user
+from pymongo.errors import DuplicateKeyError
+from utils.db import get_user_collection
+from utils.executors import run_blocking
+from middlewares.auth import get_current_user, invalidate_user
 
 url = "http://localhost:8000"
 jwt_secret = os.getenv("JWT_SECRET")
@@ -30,18 +32,24 @@ auth_router = APIRouter(prefix="/auth")
 
 @auth_router.post("/login", response_model=LoginResponse)
 async def login(login_request: LoginRequest):
-    user = user_collection.find_one({"email": login_request.email})
-    print(user)
+    user = await get_user_collection().find_one({"email": login_request.email})
     if user is None:
         raise HTTPException(
             status_code=400,
             detail="Invalid email or password",
         )
-    if not check_password(login_request.password, user.get("password")):
+    if not await check_password_async(login_request.password, user.get("password")):
         raise HTTPException(
             status_code=400,
             detail="Invalid email or password",
         )
+    if needs_rehash(user.get("password")):
+        # Upgrade the stored hash to the configured cost factor
+        await get_user_collection().update_one(
+            {"_id": user.get("_id"), "password": user.get("password")},
+            {"$set": {"password": await hash_password_async(login_request.password)}},
+        )
+        await invalidate_user(user.get("_id"))
     if not user.get("is_verified"):
         raise HTTPException(
             status_code=400,
@@ -66,15 +74,24 @@ async def login(login_request: LoginRequest):
 async def register(
     register_request: RegisterRequest,
 ) -> RegisterResponse:
-    if user_collection.find_one({"email": register_request.email}) is not None:
+    existing = await get_user_collection().find_one(
+        {"email": register_request.email}, {"_id": 1}
+    )
+    if existing is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="Email address already exists",
+        )
+    register_request.password = await hash_password_async(register_request.password)
+    try:
+        user = await get_user_collection().insert_one(
+            {"is_verified": False, **register_request.model_dump()}
+        )
+    except DuplicateKeyError:
         raise HTTPException(
             status_code=400,
             detail="Email address already exists",
         )
-    register_request.password = hash_password(register_request.password)
-    user = user_collection.insert_one(
-        {"is_verified": False, **register_request.model_dump()}
-    )
     token = jwt.encode(
         {
             "id": str(user.inserted_id),
@@ -83,7 +100,9 @@ async def register(
         jwt_secret,
         algorithm="HS256",
     )
-    send_email(
+    await run_blocking(
+        "email",
+        send_email,
         register_request.email,
         "Email Verification for Captr",
         f"Please click on this link: {url}/auth/verify?token={token}",
@@ -95,7 +114,7 @@ async def register(
 
 
 @auth_router.get("/verify")
-def verify(token: str) -> VerificationResponse:
+async def verify(token: str) -> VerificationResponse:
     try:
         decoded = jwt.decode(token, jwt_secret, algorithms=["HS256"])
     except jwt.exceptions.ExpiredSignatureError as e:
@@ -103,16 +122,16 @@ def verify(token: str) -> VerificationResponse:
             detail="This link has expired, please request for a new verification link",
             status_code=400,
         )
-    user = user_collection.find_one({"_id": objectid.ObjectId(decoded.get("id"))})
-    if not user:
+    result = await get_user_collection().update_one(
+        {"_id": objectid.ObjectId(decoded.get("id"))},
+        {"$set": {"is_verified": True}},
+    )
+    if result.matched_count == 0:
         raise HTTPException(
             detail="User not found",
             status_code=404,
         )
-    user_collection.update_one(
-        {"_id": objectid.ObjectId(decoded.get("id"))},
-        {"$set": {"is_verified": True}},
-    )
+    await invalidate_user(decoded.get("id"))
     return VerificationResponse(success=True)
 
 
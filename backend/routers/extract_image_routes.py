@@ -4,10 +4,34 @@ from pydantic import BaseModel, HttpUrl
 import sys
 import os
 import asyncio
-from utils.extract_images import extract_video_id, parse_transcript, get_stream_url, extract_frames_python
+from utils.extract_images import extract_video_id, parse_transcript, extract_frames_for_video
+from utils.executors import run_blocking
+from utils.cache import cache_bypass, register_cache
+from utils.singleflight import KeyedLock, RedisLease
 
 extract_router = APIRouter(prefix="/api/frames", tags=["frames"])
 
+# Requests for the same video extract one after another, here and (through a
+# Redis lease) across workers, so overlapping timestamp sets are merged into
+# the frames directory instead of being decoded and written twice
+frames_locks = KeyedLock()
+register_cache("frames_inflight", frames_locks)
+
+
+async def _extract_frames(video_id, video_url, timestamps, output_dir):
+    async with frames_locks.hold(video_id), RedisLease(f"frames:{video_id}"):
+        if not cache_bypass.get():
+            timestamps = [
+                (timestamp, filename) for timestamp, filename in timestamps
+                if not os.path.exists(os.path.join(output_dir, filename))
+            ]
+        if not timestamps:
+            return
+        # The response promises one file per timestamp, so keep duplicates
+        await run_blocking(
+            "frames", extract_frames_for_video, video_url, timestamps, output_dir, dedup_distance=-1
+        )
+
 class HighlightItem(BaseModel):
     timestamp: str
     description: str
@@ -44,10 +68,9 @@ async def extract_video_frames(background_tasks: BackgroundTasks, request: Frame
                 detail="No valid visual timestamps found in the highlights"
             )
         
-        def process_video_frames():
+        async def process_video_frames():
             try:
-                stream_url = get_stream_url(str(request.video_url))
-                extract_frames_python(stream_url, timestamps, output_image_dir)
+                await _extract_frames(video_id, str(request.video_url), timestamps, output_image_dir)
 
             except Exception as e:
                 print(f"Background task error: {str(e)}")
@@ -1,13 +1,15 @@
-import os
-import shutil
+import json
+import asyncio
 import logging
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List
-import asyncio
-import google.generativeai as genai
-from utils.transcribe import process_video
-from utils.extract_images import extract_video_id, extract_frames_python, get_stream_url, parse_transcript
+from typing import Any, Dict, List, Optional
+from utils.pipeline import run_full_pipeline
+from utils.batch import BATCH_MAX_VIDEOS, expand_playlist, run_batch
+from utils.executors import run_blocking
+from utils.jobs import JobQueue, JobQueueFull
+from utils.metrics import span
 
 process_router = APIRouter(prefix="/api/process", tags=["process"])
 
@@ -23,141 +25,162 @@ class FullProcessingResponse(BaseModel):
     markdown_document: str
     status: str = "completed"
 
+class BatchProcessingRequest(BaseModel):
+    playlist_url: Optional[str] = None
+    video_urls: List[str] = []
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    stages: Dict[str, Dict[str, Any]]
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class BatchJobResponse(JobStatusResponse):
+    result: Optional[Dict[str, Any]] = None
+
+
+async def _run_full_processing_job(payload, progress):
+    with span("process.job"):
+        return await run_full_pipeline(payload["video_url"], progress)
+
+async def _run_batch_job(payload, progress):
+    video_urls = payload["video_urls"]
+    if payload["playlist_url"]:
+        await progress("playlist", "running")
+        video_urls = await run_blocking("ytdlp", expand_playlist, payload["playlist_url"])
+        await progress("playlist", "completed", videos=len(video_urls))
+    if not video_urls:
+        raise ValueError("The playlist has no videos")
+    with span("process.batch"):
+        return await run_batch(video_urls, progress)
+
+process_jobs = JobQueue("process", _run_full_processing_job)
+# Each batch already runs its stages concurrently, so batches run one at a time
+batch_jobs = JobQueue("batch", _run_batch_job, workers=1)
+
+
 @process_router.post("/full", response_model=FullProcessingResponse)
 async def process_video_fully(request: FullProcessingRequest):
     try:
-        video_url = request.video_url
-        video_id = extract_video_id(video_url)
-        video_info = {"video_id": video_id, "url": video_url}
-        
-        # Get transcript and highlights
-        transcript_data = await process_video(video_url)
-        transcript_highlights = transcript_data["highlights"]
-        
-        # Extract frames based on highlights
-        frames_directory = f"frames_{video_id}"
-        os.makedirs(frames_directory, exist_ok=True)
-        
-        formatted_transcript = "\n".join([
-            f"{item['timestamp']} - visual - {item['description']}" 
-            for item in transcript_highlights
-        ])
-        
-        timestamps = parse_transcript(formatted_transcript)
-        
-        # Extract frames
-        try:
-            stream_url = get_stream_url(video_url)
-            extracted_frames = extract_frames_python(stream_url, timestamps, frames_directory)
-        except Exception as e:
-            logging.error(f"Frame extraction error: {str(e)}")
-            extracted_frames = []
-        
-        # Create a dedicated folder for this research document
-        docs_dir = "research_documents"
-        os.makedirs(docs_dir, exist_ok=True)
-        
-        document_folder = os.path.join(docs_dir, f"{video_id}_research")
-        os.makedirs(document_folder, exist_ok=True)
-        
-        # Create images subfolder
-        images_folder = os.path.join(document_folder, "images")
-        os.makedirs(images_folder, exist_ok=True)
-        
-        # Generate markdown with local image references
-        markdown = f"# Research Document: {video_id}\n\n"
-        markdown += f"Video URL: {video_url}\n\n"
-        
-        copied_images = []
-        
-        # Process highlights and generate concise notes with Gemini
-        for i, highlight in enumerate(transcript_highlights):
-            markdown += f"## {i+1}. {highlight['description']}\n\n"
-            markdown += f"Timestamp: {highlight['timestamp']}\n\n"
-            
-            # Find matching frame
-            matching_frames = [f for f in extracted_frames 
-                              if highlight['timestamp'].replace(':', '_') in f]
-            
-            if matching_frames:
-                original_frame_path = os.path.join(frames_directory, matching_frames[0])
-                if os.path.exists(original_frame_path):
-                    # Copy image to the document's images folder
-                    dest_filename = matching_frames[0]
-                    dest_path = os.path.join(images_folder, dest_filename)
-                    
-                    shutil.copy2(original_frame_path, dest_path)
-                    copied_images.append(dest_filename)
-                    
-                    # Add image reference to markdown (using relative path)
-                    markdown += f"![{highlight['description']}](images/{dest_filename})\n\n"
-            
-            # Generate concise notes with Gemini
-            model = genai.GenerativeModel("gemini-1.5-flash")
-            prompt = f"""
-            Create concise educational notes (maximum 150 words) for this concept from a video:
-
-            Topic: {highlight['description']}
-            Timestamp: {highlight['timestamp']}
-
-            Your notes should:
-            1. Explain the key concept clearly
-            2. Include only essential points
-            3. Use bullet points where appropriate
-            4. Be under 150 words total
-
-            Format as Markdown.
-            """
-            
-            try:
-                response = model.generate_content(prompt)
-                markdown += f"{response.text}\n\n"
-            except Exception as e:
-                logging.error(f"Error generating notes: {str(e)}")
-                markdown += "Notes unavailable for this segment.\n\n"
-            
-            markdown += "---\n\n"
-        
-        # Generate concise summary
-        try:
-            summary_prompt = f"""
-            Create a brief summary (maximum 100 words) of this video content:
-
-            Video topic areas: {', '.join([h['description'] for h in transcript_highlights])}
-            
-            Include:
-            - Main theme or purpose
-            - 2-3 key takeaways
-            - Keep under 200 words total
-            """
-            
-            summary_response = model.generate_content(summary_prompt)
-            markdown += f"## Summary\n\n{summary_response.text}\n\n"
-        except Exception as e:
-            logging.error(f"Error generating summary: {str(e)}")
-        
-        # Save markdown to file with video ID as filename
-        markdown_filename = f"{video_id}.md"
-        markdown_path = os.path.join(document_folder, markdown_filename)
-        
-        with open(markdown_path, 'w', encoding='utf-8') as md_file:
-            md_file.write(markdown)
-        
-        # Clean up original image directory after copying relevant images
-        if os.path.exists(frames_directory):
-            shutil.rmtree(frames_directory)
-            logging.info(f"Deleted original image directory: {frames_directory}")
-        
-        return FullProcessingResponse(
-            video_id=video_id,
-            url=video_url,
-            transcript_highlights=transcript_highlights,
-            frames_directory=document_folder,
-            extracted_frames=copied_images,
-            markdown_document=markdown,
-            status="completed"
-        )
+        with span("process.full"):
+            result = await run_full_pipeline(request.video_url)
+        return FullProcessingResponse(**result)
 
     except Exception as e:
         logging.exception("Error in /full processing route")
         raise HTTPException(status_code=500, detail=f"Failed to process video: {str(e)}")
+
+@process_router.post("/full/stream")
+async def process_video_fully_stream(request: FullProcessingRequest):
+    """Run the full pipeline, streaming partial results as Server-Sent Events.
+
+    Emits ``highlights``, one ``frame`` per extracted image, one ``note`` per
+    highlight (in completion order, with its index), ``summary`` and finally
+    ``done`` with the complete response, or ``error``.
+    """
+    queue = asyncio.Queue()
+
+    async def emit(event, data):
+        await queue.put((event, data))
+
+    async def run():
+        try:
+            with span("process.stream"):
+                result = await run_full_pipeline(request.video_url, events=emit)
+            await emit("done", FullProcessingResponse(**result).model_dump())
+        except Exception as e:
+            logging.exception("Error in /full/stream processing route")
+            await emit("error", {"message": f"Failed to process video: {str(e)}"})
+
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event, data = await queue.get()
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                if event in ("done", "error"):
+                    break
+        finally:
+            # Stop listening if the client goes away mid-stream; the pipeline
+            # itself stops once no other caller is waiting for it
+            task.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@process_router.post("/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_processing_job(request: FullProcessingRequest):
+    """Queue a full processing run and return immediately with its job id."""
+    try:
+        job = await process_jobs.submit({"video_url": request.video_url})
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JobSubmitResponse(job_id=job["id"], status=job["status"])
+
+@process_router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_processing_job(job_id: str):
+    """Report the status and per-stage progress of a processing job."""
+    job = await process_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatusResponse(
+        job_id=job["id"],
+        status=job["status"],
+        stages=job["stages"],
+        error=job["error"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+    )
+
+@process_router.get("/jobs/{job_id}/result", response_model=FullProcessingResponse)
+async def get_processing_job_result(job_id: str):
+    """Return the processed document once the job has completed."""
+    job = await process_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Failed to process video: {job['error']}")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is still {job['status']}")
+    return FullProcessingResponse(**job["result"])
+
+@process_router.post("/batch", response_model=JobSubmitResponse, status_code=202)
+async def submit_batch_job(request: BatchProcessingRequest):
+    """Queue a playlist, channel or list of videos for pipelined processing."""
+    if bool(request.playlist_url) == bool(request.video_urls):
+        raise HTTPException(status_code=400, detail="Provide either playlist_url or video_urls")
+    if len(request.video_urls) > BATCH_MAX_VIDEOS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_VIDEOS} videos per batch")
+    try:
+        job = await batch_jobs.submit(request.model_dump())
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JobSubmitResponse(job_id=job["id"], status=job["status"])
+
+@process_router.get("/batch/{job_id}", response_model=BatchJobResponse)
+async def get_batch_job(job_id: str):
+    """Report per-stage progress of a batch and, once finished, per-video results and throughput."""
+    job = await batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return BatchJobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        stages=job["stages"],
+        error=job["error"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        result=job["result"],
+    )
@@ -0,0 +1,49 @@
+import asyncio
+
+from utils.cache import cache_bypass
+from utils.jobs import JobQueue
+from utils.singleflight import SingleFlight
+
+
+def test_job_queue_applies_bypass_per_job():
+    seen = []
+
+    async def handler(payload, progress):
+        seen.append((payload["n"], cache_bypass.get()))
+
+    async def main():
+        queue = JobQueue("bypass-test", handler, workers=1)
+        cache_bypass.set(True)
+        await queue.submit({"n": 1})
+        cache_bypass.set(False)
+        await queue.submit({"n": 2})
+        await queue._queue.join()
+        await queue.stop()
+
+    asyncio.run(main())
+    assert seen == [(1, True), (2, False)]
+
+
+def test_single_flight_does_not_share_across_bypass():
+    calls = []
+
+    async def work(tag):
+        calls.append((tag, cache_bypass.get()))
+        await asyncio.sleep(0.01)
+        return tag
+
+    async def caller(tag, bypass):
+        cache_bypass.set(bypass)
+        return await flight.do("key", work, tag)
+
+    flight = SingleFlight()
+
+    async def main():
+        return await asyncio.gather(
+            asyncio.create_task(caller("bypass", True)),
+            asyncio.create_task(caller("cached", False)),
+            asyncio.create_task(caller("cached-too", False)),
+        )
+
+    assert asyncio.run(main()) == ["bypass", "cached", "cached"]
+    assert calls == [("bypass", True), ("cached", False)]
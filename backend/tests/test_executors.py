@@ -0,0 +1,20 @@
+import asyncio
+
+from utils.executors import run_blocking, shutdown_executors
+
+
+def test_pools_are_recreated_after_shutdown():
+    assert asyncio.run(run_blocking("test", sum, [1, 2])) == 3
+    shutdown_executors()
+    assert asyncio.run(run_blocking("test", sum, [3, 4])) == 7
+    shutdown_executors()
+
+
+def test_queue_wait_and_exec_time_are_exported():
+    from utils import metrics
+
+    asyncio.run(run_blocking("test", sum, [1, 2]))
+    rendered = metrics.render()
+    assert 'captr_stage_duration_seconds_count{stage="executor.test.queue_wait"}' in rendered
+    assert 'captr_stage_duration_seconds_count{stage="executor.test.exec"}' in rendered
+    shutdown_executors()
@@ -0,0 +1,32 @@
+import asyncio
+import os
+
+from routers import extract_image_routes
+
+
+def test_overlapping_frame_requests_extract_each_frame_once(tmp_path, monkeypatch):
+    extracted = []
+
+    def fake_extract(video_url, timestamps, output_dir, **kwargs):
+        extracted.append([filename for _, filename in timestamps])
+        os.makedirs(output_dir, exist_ok=True)
+        for _, filename in timestamps:
+            open(os.path.join(output_dir, filename), "wb").close()
+
+    async def fake_run_blocking(name, fn, *args, **kwargs):
+        await asyncio.sleep(0.01)
+        return fn(*args, **kwargs)
+
+    monkeypatch.setattr(extract_image_routes, "extract_frames_for_video", fake_extract)
+    monkeypatch.setattr(extract_image_routes, "run_blocking", fake_run_blocking)
+    output_dir = str(tmp_path / "frames")
+
+    async def main():
+        await asyncio.gather(
+            extract_image_routes._extract_frames("vid", "url", [(1, "a.jpg"), (2, "b.jpg")], output_dir),
+            extract_image_routes._extract_frames("vid", "url", [(2, "b.jpg"), (3, "c.jpg")], output_dir),
+        )
+
+    asyncio.run(main())
+    assert extracted == [["a.jpg", "b.jpg"], ["c.jpg"]]
+    assert extract_image_routes.frames_locks.stats()["in_flight"] == 0
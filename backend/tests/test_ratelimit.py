@@ -0,0 +1,13 @@
+import asyncio
+
+from utils.ratelimit import AsyncRateLimiter
+
+
+def test_limiter_survives_several_event_loops():
+    limiter = AsyncRateLimiter(100, burst=1)
+
+    async def contend():
+        await asyncio.gather(*(limiter.acquire() for _ in range(3)))
+
+    for _ in range(3):
+        asyncio.run(contend())
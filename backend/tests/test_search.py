@@ -0,0 +1,24 @@
+import asyncio
+from types import SimpleNamespace
+
+from utils import search
+
+
+def test_empty_results_are_not_cached(monkeypatch):
+    answers = iter(["", "first query\nsecond query"])
+
+    async def generate(prompt, model_name=None):
+        return SimpleNamespace(text=next(answers))
+
+    async def run_blocking(name, fn, *args):
+        return {"entries": []}
+
+    monkeypatch.setattr(search.llm, "generate", generate)
+    monkeypatch.setattr(search, "run_blocking", run_blocking)
+
+    assert asyncio.run(search.get_youtube_search_queries("empty topic")) == []
+    assert asyncio.run(search.get_youtube_search_queries("empty topic")) == ["first query", "second query"]
+
+    assert asyncio.run(search.search_youtube_video("nothing here")) == []
+    key = search.search_cache.key("videos", "nothing here", 3)
+    assert asyncio.run(search.search_cache.get(key)) is None
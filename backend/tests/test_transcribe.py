@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from utils import transcribe
+from utils.transcribe import chunk_span, merge_highlights, split_transcript
+
+
+def timed_lines(count, step):
+    return "\n".join(
+        f"{s // 60:02d}:{s % 60:02d} - line {n} " + "x" * 40
+        for n, s in enumerate(range(0, count * step, step))
+    )
+
+
+def test_untimestamped_transcript_is_not_resent():
+    text = "\n".join(f"plain line {n} " + "y" * 180 for n in range(150))
+    chunks = split_transcript(text, chunk_seconds=600, overlap_seconds=60, max_chars=2000)
+
+    assert "\n".join(chunks) == text
+    assert len(chunks) <= len(text) // 1500 + 1
+
+
+def test_same_timestamp_transcript_is_not_resent():
+    text = "\n".join(f"00:05 - line {n} " + "z" * 180 for n in range(150))
+    chunks = split_transcript(text, chunk_seconds=600, overlap_seconds=60, max_chars=2000)
+
+    assert "\n".join(chunks) == text
+
+
+def test_dense_timestamps_step_back_at_most_half_a_chunk():
+    text = timed_lines(600, 1)
+    chunks = split_transcript(text, chunk_seconds=60, overlap_seconds=60, max_chars=100000)
+
+    assert sum(len(chunk) for chunk in chunks) <= 2 * len(text)
+    assert len(chunks) <= 2 * 600 // 60 + 1
+
+
+def test_timed_chunks_overlap():
+    chunks = split_transcript(timed_lines(120, 10), chunk_seconds=600, overlap_seconds=60, max_chars=100000)
+
+    assert len(chunks) == 3
+    first, second = chunk_span(chunks[0]), chunk_span(chunks[1])
+    assert second[0] < first[1]
+    assert first[1] - second[0] <= 60
+
+
+def highlight(timestamp, chunk, kind="visual"):
+    return {"timestamp": timestamp, "description": f"{kind} - something at {timestamp}", "chunk": chunk}
+
+
+def test_merge_keeps_close_highlights_from_one_chunk():
+    spans = [(0, 600), (540, 1200)]
+    merged = merge_highlights([highlight("01:00", 0), highlight("01:15", 0)], spans)
+
+    assert [h["timestamp"] for h in merged] == ["01:00", "01:15"]
+    assert all("chunk" not in h for h in merged)
+
+
+def test_merge_drops_repeats_inside_chunk_overlap():
+    spans = [(0, 600), (540, 1200)]
+    merged = merge_highlights([highlight("09:10", 0), highlight("09:20", 1), highlight("09:25", 1, "text")], spans)
+
+    assert [h["timestamp"] for h in merged] == ["09:10", "09:25"]
+
+
+def test_merge_keeps_highlights_outside_chunk_overlap():
+    spans = [(0, 600), (540, 1200)]
+    merged = merge_highlights([highlight("08:50", 0), highlight("09:05", 1)], spans)
+
+    assert len(merged) == 2
+
+
+def test_analyze_tags_highlights_with_their_chunk(monkeypatch):
+    async def generate(prompt):
+        first = prompt.split("Transcript:\n", 1)[1].split(" - ", 1)[0]
+        return SimpleNamespace(text=f"{first} - visual - start of chunk\n{first} - visual - same moment")
+
+    monkeypatch.setattr(transcribe.llm, "generate", generate)
+
+    text = timed_lines(120, 10)
+    highlights = asyncio.run(transcribe.analyze_visual_segments(text))
+
+    assert [h["timestamp"] for h in highlights].count("00:00") == 2
+
+
+def test_transcript_cache_is_bounded_by_bytes():
+    cache = transcribe.transcript_cache.memory
+    assert cache.max_bytes
+    segments = [{"start": 0.0, "duration": 5.0, "text": "x" * 100}] * 10
+    assert transcribe._transcript_size([segments, "en", False]) == 10 * 132
+
+
+def test_partial_analysis_failure_is_raised_not_cached(monkeypatch):
+    calls = []
+
+    async def generate(prompt):
+        calls.append(prompt)
+        first = prompt.split("Transcript:\n", 1)[1].split(" - ", 1)[0]
+        if first != "00:00" and len(calls) <= 3:
+            raise ConnectionError("transient")
+        return SimpleNamespace(text=f"{first} - visual - start of chunk")
+
+    monkeypatch.setattr(transcribe.llm, "generate", generate)
+    transcript = [{"start": float(s), "duration": 10.0, "text": "x" * 40} for s in range(0, 1200, 10)]
+
+    async def highlights():
+        return await transcribe.get_highlights("partialFail", transcript, "en", False)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(highlights())
+    assert asyncio.run(transcribe.highlights_cache.get(
+        transcribe.highlights_cache.key("partialFail", "en", transcribe.ANALYSIS_PROMPT_VERSION)
+    )) is None
+    assert len(asyncio.run(highlights())) == 3
@@ -0,0 +1,259 @@
+import os
+import time
+import asyncio
+import logging
+from dotenv import load_dotenv
+from utils import ytdlp
+from utils.executors import run_blocking
+from utils.transcribe import get_transcript, get_highlights
+from utils.extract_images import extract_video_id, get_stream_url
+from utils.pipeline import frames_stored, run_full_pipeline
+
+load_dotenv()
+
+BATCH_MAX_VIDEOS = int(os.getenv("BATCH_MAX_VIDEOS", "200"))
+BATCH_QUEUE_SIZE = int(os.getenv("BATCH_QUEUE_SIZE", "4"))
+
+# Workers per stage, overridable with BATCH_<STAGE>_WORKERS
+DEFAULT_STAGE_WORKERS = {
+    "transcript": 4,
+    "analysis": 2,
+    "stream": 2,
+    "frames": 2,
+    "notes": 2,
+}
+
+_DONE = object()
+
+
+class Stage:
+    """One step of a ``StagedPipeline`` with its own workers and input queue."""
+
+    def __init__(self, name, fn, workers: int = None, queue_size: int = BATCH_QUEUE_SIZE):
+        if workers is None:
+            workers = int(os.getenv(f"BATCH_{name.upper()}_WORKERS", str(DEFAULT_STAGE_WORKERS.get(name, 1))))
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+
+    def stats(self, elapsed: float) -> dict:
+        capacity = self.workers * elapsed
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "utilization": round(self.busy_seconds / capacity, 3) if capacity else 0.0,
+            "max_queue_depth": self.max_depth,
+        }
+
+
+class StagedPipeline:
+    """Run items through stages concurrently, each stage draining its own bounded queue.
+
+    Item N+1 can be in an early stage while item N is in a later one. Bounded
+    queues apply backpressure so a fast stage cannot race ahead of a slow
+    one. An item whose stage raises is marked failed and skips the rest.
+    """
+
+    def __init__(self, stages: list, progress=None):
+        self.stages = stages
+        self.progress = progress
+        self.elapsed = 0.0
+
+    async def run(self, items: list) -> list:
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        results = []
+        start = time.perf_counter()
+
+        async def report(index):
+            stage = self.stages[index]
+            if self.progress is not None:
+                await self.progress(
+                    stage.name, "running",
+                    processed=stage.processed, failed=stage.failed, queued=queues[index].qsize(),
+                )
+
+        async def worker(index):
+            stage, queue = self.stages[index], queues[index]
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    return
+                busy_start = time.perf_counter()
+                try:
+                    await stage.fn(item)
+                except Exception as e:
+                    logging.exception(f"Batch stage '{stage.name}' failed for {item.get('video_url')}")
+                    stage.failed += 1
+                    item["status"] = "failed"
+                    item["error"] = f"{stage.name}: {e}"
+                else:
+                    stage.processed += 1
+                finally:
+                    stage.busy_seconds += time.perf_counter() - busy_start
+                await report(index)
+                if item.get("status") == "failed" or index == len(self.stages) - 1:
+                    item.setdefault("status", "completed")
+                    results.append(item)
+                else:
+                    await queues[index + 1].put(item)
+                    next_stage = self.stages[index + 1]
+                    next_stage.max_depth = max(next_stage.max_depth, queues[index + 1].qsize())
+
+        async def run_stage(index):
+            stage = self.stages[index]
+            await asyncio.gather(*(worker(index) for _ in range(stage.workers)))
+            # Every worker of this stage is done, so the next stage has all its input
+            if index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].workers):
+                    await queues[index + 1].put(_DONE)
+            if self.progress is not None:
+                await self.progress(stage.name, "completed", processed=stage.processed, failed=stage.failed)
+
+        async def feed():
+            for item in items:
+                await queues[0].put(item)
+                self.stages[0].max_depth = max(self.stages[0].max_depth, queues[0].qsize())
+            for _ in range(self.stages[0].workers):
+                await queues[0].put(_DONE)
+
+        await asyncio.gather(feed(), *(run_stage(i) for i in range(len(self.stages))))
+        self.elapsed = time.perf_counter() - start
+        return sorted(results, key=lambda item: item["index"])
+
+    def stats(self) -> dict:
+        return {stage.name: stage.stats(self.elapsed) for stage in self.stages}
+
+
+async def _transcript_stage(item):
+    item["video_id"] = extract_video_id(item["video_url"])
+    if not item["video_id"]:
+        raise ValueError("Invalid YouTube URL")
+    item["transcript"] = await get_transcript(item["video_id"])
+
+
+async def _analysis_stage(item):
+    item["highlights"] = await get_highlights(item["video_id"], *item.pop("transcript"))
+
+
+async def _stream_stage(item):
+    # Frames stored by an earlier run need no stream
+    if not await frames_stored(item["video_id"], item["highlights"]):
+        item["stream_url"] = await run_blocking("ytdlp", get_stream_url, item["video_url"])
+
+
+async def _frames_stage(item):
+    # The video goes through run_full_pipeline so that it shares the
+    # single-flight and Redis lease with /full requests and jobs across both
+    # stages: the run pauses after its frames until the notes stage resumes it
+    frames_done = asyncio.Event()
+    notes_ready = asyncio.Event()
+
+    async def progress(stage, status, **detail):
+        if stage == "frames" and status == "completed":
+            frames_done.set()
+
+    run = asyncio.create_task(run_full_pipeline(
+        item["video_url"], progress=progress, highlights=item["highlights"],
+        stream_url=item.pop("stream_url", None), notes_ready=notes_ready,
+    ))
+    item["run"], item["notes_ready"] = run, notes_ready
+    waiter = asyncio.create_task(frames_done.wait())
+    try:
+        # A run joined after its frames, or served from the result cache,
+        # never reports them
+        await asyncio.wait({run, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+    if run.done():
+        run.result()
+
+
+async def _notes_stage(item):
+    item.pop("notes_ready").set()
+    result = await item.pop("run")
+    item["document_folder"] = result["frames_directory"]
+    item["extracted_frames"] = result["extracted_frames"]
+
+
+def build_stages() -> list:
+    return [
+        Stage("transcript", _transcript_stage),
+        Stage("analysis", _analysis_stage),
+        Stage("stream", _stream_stage),
+        Stage("frames", _frames_stage),
+        Stage("notes", _notes_stage),
+    ]
+
+
+def expand_playlist(url: str, limit: int = BATCH_MAX_VIDEOS) -> list:
+    """List the video URLs of a playlist or channel without resolving each video (blocking)."""
+    info = ytdlp.extract_info(url, {"extract_flat": "in_playlist", "quiet": True, "playlistend": limit})
+    urls = []
+    for entry in info.get("entries") or [info]:
+        if len(urls) >= limit:
+            break
+        video_id = entry.get("id")
+        if video_id and len(video_id) == 11:
+            urls.append(f"https://www.youtube.com/watch?v={video_id}")
+        elif entry.get("ie_key") == "YoutubeTab" and entry.get("url"):
+            # Channels list their tabs (videos, shorts, ...) as nested playlists
+            urls.extend(expand_playlist(entry["url"], limit - len(urls)))
+    return urls[:limit]
+
+
+async def run_batch(video_urls: list, progress=None) -> dict:
+    """Turn every video into a research document using the staged pipeline.
+
+    Returns per-video outcomes plus overall throughput and per-stage
+    utilization (busy time over worker time available). A video listed more
+    than once is processed once.
+    """
+    unique_urls = []
+    seen = set()
+    for url in video_urls:
+        video_id = extract_video_id(url)
+        if video_id in seen:
+            continue
+        if video_id:
+            seen.add(video_id)
+        unique_urls.append(url)
+    items = [{"index": i, "video_url": url} for i, url in enumerate(unique_urls)]
+    pipeline = StagedPipeline(build_stages(), progress)
+    try:
+        results = await pipeline.run(items)
+    finally:
+        # A run left waiting for the notes stage would hold its lease forever
+        for item in items:
+            if "run" in item:
+                item["run"].cancel()
+    completed = sum(1 for item in results if item["status"] == "completed")
+    return {
+        "videos": [
+            {
+                "video_url": item["video_url"],
+                "video_id": item.get("video_id"),
+                "status": item["status"],
+                "error": item.get("error"),
+                "frames_directory": item.get("document_folder"),
+                "highlights": len(item.get("highlights", [])),
+                "extracted_frames": item.get("extracted_frames", []),
+            }
+            for item in results
+        ],
+        "stats": {
+            "videos": len(items),
+            "duplicates": len(video_urls) - len(items),
+            "completed": completed,
+            "failed": len(results) - completed,
+            "elapsed_seconds": round(pipeline.elapsed, 3),
+            "videos_per_minute": round(60 * len(items) / pipeline.elapsed, 2) if pipeline.elapsed else 0.0,
+            "stages": pipeline.stats(),
+        },
+    }
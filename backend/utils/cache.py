@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from utils.metrics import register_collector
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+
+_MISSING = object()
+
+# Set per request (X-Cache-Bypass header) to skip reads from bypassable caches
+cache_bypass = ContextVar("cache_bypass", default=False)
+
+# Named caches whose hit/miss counters are reported by cache_stats()
+_registry = {}
+
+
+def register_cache(name: str, cache):
+    _registry[name] = cache
+
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def _collect_metrics():
+    hits, misses, ratios, entries = [], [], [], []
+    for name, stats in cache_stats().items():
+        if "hits" not in stats:
+            continue
+        labels = {"cache": name}
+        lookups = stats["hits"] + stats["misses"]
+        hits.append((labels, stats["hits"]))
+        misses.append((labels, stats["misses"]))
+        ratios.append((labels, stats["hits"] / lookups if lookups else 0.0))
+        entries.append((labels, stats["entries"]))
+    return [
+        ("captr_cache_hits_total", "counter", "Cache hits.", hits),
+        ("captr_cache_misses_total", "counter", "Cache misses.", misses),
+        ("captr_cache_hit_ratio", "gauge", "Hits over lookups since start.", ratios),
+        ("captr_cache_entries", "gauge", "Entries held in process.", entries),
+    ]
+
+
+register_collector(_collect_metrics)
+
+
+_redis_clients = {}
+
+
+def get_redis(redis_url: str = REDIS_URL):
+    """Shared asyncio Redis client for ``redis_url``, or None when unavailable."""
+    if not redis_url:
+        return None
+    client = _redis_clients.get(redis_url)
+    if client is None:
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:  # Redis is optional, the in-process tier still works
+            logging.warning("REDIS_URL is set but the redis package is not installed")
+            return None
+        client = _redis_clients[redis_url] = aioredis.from_url(redis_url, socket_timeout=1.0)
+    return client
+
+
+async def close_redis():
+    """Close the shared Redis clients; call on shutdown."""
+    for client in _redis_clients.values():
+        try:
+            await client.aclose()
+        except Exception as e:
+            logging.warning(f"Could not close Redis client: {e}")
+    _redis_clients.clear()
+
+
+def make_key(namespace: str, *parts) -> str:
+    """Build a content-addressed cache key from a namespace and its inputs."""
+    digest = hashlib.sha256(
+        json.dumps(parts, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f"captr:{namespace}:{digest[:40]}"
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry TTL.
+
+    Evicts least recently used entries beyond ``max_entries`` and, when
+    ``max_bytes`` is set, beyond that total ``sizeof(value)``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl: float = CACHE_TTL_SECONDS,
+        max_bytes: int = None,
+        sizeof=len,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.size -= size
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = self.sizeof(value) if self.max_bytes else 0
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+            self._data[key] = (value, expires_at, size)
+            self.size += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes and self.size > self.max_bytes and len(self._data) > 1
+            ):
+                _, evicted = self._data.popitem(last=False)
+                self.size -= evicted[2]
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self.size -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        stats = {"hits": self.hits, "misses": self.misses, "entries": len(self._data)}
+        if self.max_bytes:
+            stats["bytes"] = self.size
+        return stats
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """In-process LRU in front of a shared Redis tier.
+
+    Values must be JSON serializable. Redis failures are logged and treated as
+    misses so a cache outage never fails the request that hit it. Reads from a
+    ``bypassable`` cache are skipped while ``cache_bypass`` is set; writes still
+    happen so the fresh value replaces the old one.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float = CACHE_TTL_SECONDS,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        redis_url: str = REDIS_URL,
+        max_bytes: int = None,
+        sizeof=len,
+        bypassable: bool = False,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.bypassable = bypassable
+        self.memory = LRUCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes, sizeof=sizeof)
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._redis = get_redis(redis_url)
+        register_cache(namespace, self)
+
+    def key(self, *parts) -> str:
+        return make_key(self.namespace, *parts)
+
+    async def get(self, key):
+        if self.bypassable and cache_bypass.get():
+            self.bypassed += 1
+            return None
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(key)
+            except Exception as e:
+                logging.warning(f"Redis get failed for {key}: {e}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self.memory.set(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        self.memory.set(key, value, ttl)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(key, json.dumps(value), ex=int(ttl) if ttl else None)
+        except Exception as e:
+            logging.warning(f"Redis set failed for {key}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "memory_hits": self.memory.hits,
+            "entries": len(self.memory),
+            "bytes": self.memory.size if self.memory.max_bytes else None,
+            "redis": self._redis is not None,
+        }
+
+    async def delete(self, key):
+        self.memory.delete(key)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.delete(key)
+        except Exception as e:
+            logging.warning(f"Redis delete failed for {key}: {e}")
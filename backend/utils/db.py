@@ -1,17 +1,55 @@
 import os
-import pymongo
-from dotenv import load_dotenv
 import logging
-from pymongo.errors import CollectionInvalid
+from dotenv import load_dotenv
 
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
+
+# Fields safe to return for a user; password hashes are only read by login
+USER_PUBLIC_PROJECTION = {"password": 0}
+
+_client = None
+_user_collection = None
+
+
+def connect():
+    """Create the shared Mongo client once; called from the app's lifespan hook.
+
+    Connecting is lazy in motor, so this never waits on the server.
+    """
+    global _client, _user_collection
+    if _client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        _client = AsyncIOMotorClient(
+            MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+        )
+    if _user_collection is None:
+        _user_collection = _client.users.users
+    return _client
+
+
+def get_user_collection():
+    if _user_collection is None:
+        connect()
+    return _user_collection
+
+
+async def ensure_indexes():
+    """Create the indexes the auth routes rely on."""
+    await get_user_collection().create_index("email", unique=True)
+    logging.info("Ensured unique index on users.email")
 
-client = pymongo.MongoClient(MONGO_URI)
-db = client.users
 
-try:
-    user_collection = db.create_collection("users")
-except CollectionInvalid:
-    user_collection = db.users
+def close():
+    global _client, _user_collection
+    if _client is not None:
+        _client.close()
+    _client = _user_collection = None
@@ -1,13 +1,14 @@
-import resend
 import os
 from dotenv import load_dotenv
-import resend.emails
 
 load_dotenv()
-resend.api_key = os.getenv("RESEND_API_KEY")
 
 
 def send_email(to: str, title: str, html: str):
+    # resend is slow to import and only needed on registration
+    import resend
+
+    resend.api_key = os.getenv("RESEND_API_KEY")
     resend.Emails.send(
         {
             "from": os.getenv("RESEND_EMAIL"),
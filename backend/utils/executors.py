@@ -0,0 +1,184 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from utils.metrics import observe, register_collector
+
+load_dotenv()
+
+# Default pool sizes per blocking dependency, overridable with
+# EXECUTOR_<NAME>_WORKERS; EXECUTOR_<NAME>_TIMEOUT sets a per-call timeout.
+DEFAULT_WORKERS = {
+    "ytdlp": 4,
+    "transcript": 4,
+    "llm": 8,
+    "frames": 2,
+    "frame_store": 2,
+    # cv2.imencode releases the GIL, so encoding overlaps with decoding
+    "encode": int(os.getenv("FRAME_ENCODE_WORKERS", "2")),
+    "bcrypt": int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1))),
+    "email": 2,
+    "profile": 1,
+    "warmup": 1,
+}
+DEFAULT_TIMEOUT = {
+    "ytdlp": 60,
+    "transcript": 30,
+    "llm": 120,
+    "frames": 900,
+    "frame_store": 60,
+    "bcrypt": 30,
+    "email": 30,
+    "profile": 60,
+    "warmup": 120,
+}
+
+
+class BoundedExecutor:
+    """Named thread pool that records queue wait and execution time.
+
+    Both are also observed as the ``executor.<name>.queue_wait`` and
+    ``executor.<name>.exec`` stage histograms in /metrics.
+
+    A timed out call stops being awaited but its thread runs to completion,
+    since Python threads cannot be interrupted.
+    """
+
+    def __init__(self, name: str, workers: int, timeout: float = None):
+        self.name = name
+        self.workers = workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+        self.exec_seconds = 0.0
+
+    def _tracked(self, fn, args, kwargs):
+        submitted = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+
+        def call():
+            started = time.perf_counter()
+            with self._lock:
+                wait = started - submitted
+                self.queued -= 1
+                self.running += 1
+                self.queue_wait_seconds += wait
+                self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, wait)
+            observe(f"executor.{self.name}.queue_wait", wait)
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                observe(f"executor.{self.name}.exec", elapsed)
+                with self._lock:
+                    self.running -= 1
+                    self.exec_seconds += elapsed
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        return call
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue a call from synchronous code, e.g. another pool's thread.
+
+        Returns a ``concurrent.futures.Future``; the pool timeout does not apply.
+        """
+        return self._pool.submit(self._tracked(fn, args, kwargs))
+
+    async def run(self, fn, *args, timeout: float = None, **kwargs):
+        call = self._tracked(fn, args, kwargs)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, call)
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logging.warning(f"{self.name} call timed out after {timeout}s")
+            raise
+
+    def stats(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "avg_queue_wait_ms": self.queue_wait_seconds / finished * 1000 if finished else 0.0,
+            "max_queue_wait_ms": self.max_queue_wait_seconds * 1000,
+            "avg_exec_ms": self.exec_seconds / finished * 1000 if finished else 0.0,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            prefix = f"EXECUTOR_{name.upper()}"
+            workers = int(os.getenv(f"{prefix}_WORKERS", str(DEFAULT_WORKERS.get(name, 4))))
+            timeout = os.getenv(f"{prefix}_TIMEOUT", DEFAULT_TIMEOUT.get(name))
+            executor = BoundedExecutor(name, workers, float(timeout) if timeout else None)
+            _executors[name] = executor
+        return executor
+
+
+async def run_blocking(name: str, fn, *args, timeout: float = None, **kwargs):
+    """Run a blocking call on the named executor without blocking the event loop."""
+    return await get_executor(name).run(fn, *args, timeout=timeout, **kwargs)
+
+
+def executor_stats() -> dict:
+    return {name: executor.stats() for name, executor in _executors.items()}
+
+
+def _collect_metrics():
+    stats = executor_stats()
+
+    def samples(field):
+        return [({"pool": name}, pool[field]) for name, pool in stats.items()]
+
+    return [
+        ("captr_executor_workers", "gauge", "Threads per executor pool.", samples("workers")),
+        ("captr_executor_queued", "gauge", "Calls waiting for a thread.", samples("queued")),
+        ("captr_executor_running", "gauge", "Calls running on a thread.", samples("running")),
+        ("captr_executor_completed_total", "counter", "Calls that returned.", samples("completed")),
+        ("captr_executor_failed_total", "counter", "Calls that raised.", samples("failed")),
+        ("captr_executor_timeouts_total", "counter", "Calls that timed out.", samples("timeouts")),
+    ]
+
+
+register_collector(_collect_metrics)
+
+
+def shutdown_executors():
+    """Shut every pool down and forget it, so a restarted app gets fresh ones."""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
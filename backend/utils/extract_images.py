@@ -1,9 +1,47 @@
 import os
 import re
+import time
 import string
-import cv2
 import subprocess
-from yt_dlp import YoutubeDL
+from urllib.parse import urlparse, parse_qs
+from dotenv import load_dotenv
+from utils import ytdlp
+from utils.cache import LRUCache, register_cache
+from utils.executors import get_executor
+from utils.lazy import lazy_import
+from utils.metrics import span, timed
+
+load_dotenv()
+
+# OpenCV and numpy take a while to import; load them when frames are first needed
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+FRAME_EXTRACTION_MODE = os.getenv("FRAME_EXTRACTION_MODE", "sequential")
+# Gaps longer than this are crossed by seeking rather than grabbing frames
+SEEK_THRESHOLD_SECONDS = float(os.getenv("FRAME_SEEK_THRESHOLD_SECONDS", "5"))
+
+# Frames whose dHash differs by at most this many bits are stored once (-1 disables)
+FRAME_DEDUP_DISTANCE = int(os.getenv("FRAME_DEDUP_DISTANCE", "5"))
+
+# Output encoding: png, jpeg or webp; quality applies to jpeg/webp (0-100)
+FRAME_FORMAT = os.getenv("FRAME_FORMAT", "png").lower()
+FRAME_QUALITY = int(os.getenv("FRAME_QUALITY", "85"))
+# Longest side in pixels, 0 keeps the source resolution
+FRAME_MAX_DIMENSION = int(os.getenv("FRAME_MAX_DIMENSION", "0"))
+# Longest side of an extra thumbnail per frame, 0 disables thumbnails
+FRAME_THUMBNAIL_SIZE = int(os.getenv("FRAME_THUMBNAIL_SIZE", "0"))
+
+FRAME_EXTENSIONS = {"png": "png", "jpeg": "jpg", "jpg": "jpg", "webp": "webp"}
+FRAME_EXTENSION = FRAME_EXTENSIONS.get(FRAME_FORMAT, "png")
+
+STREAM_URL_FORMAT = 'best[ext=mp4]/best'
+STREAM_URL_CACHE_TTL = int(os.getenv("STREAM_URL_CACHE_TTL", "3600"))
+# Stop handing out a signed URL this many seconds before it expires
+STREAM_URL_EXPIRY_MARGIN = int(os.getenv("STREAM_URL_EXPIRY_MARGIN", "300"))
+
+_stream_url_cache = LRUCache(max_entries=256, ttl=STREAM_URL_CACHE_TTL)
+register_cache("stream_url", _stream_url_cache)
 
 def sanitize_filename(text):
     text = text.lower()
@@ -17,6 +55,12 @@ def extract_video_id(url):
         return match.group(1)
     return None
 
+def normalize_timestamp(timestamp):
+    """Ensure timestamp is in HH:MM:SS format."""
+    if len(timestamp) == 5:  # MM:SS format
+        return "00:" + timestamp
+    return timestamp
+
 def parse_transcript(transcript):
     """Extract timestamps and descriptions from transcript text."""
     timestamps = []
@@ -30,35 +74,194 @@ def parse_transcript(transcript):
             timestamp = match.group(1)
             description = match.group(2).strip()
             
-            # Ensure timestamp is in HH:MM:SS format
-            if len(timestamp) == 5:  # MM:SS format
-                timestamp = "00:" + timestamp
+            timestamp = normalize_timestamp(timestamp)
                 
             # Create sanitized filename
-            filename = f"{timestamp.replace(':', '_')}_visual_{sanitize_filename(description)}.png"
+            filename = f"{timestamp.replace(':', '_')}_visual_{sanitize_filename(description)}.{FRAME_EXTENSION}"
             
             timestamps.append((timestamp, filename))
     
     return timestamps
 
-def get_stream_url(video_url):
-    """Get direct video stream URL using yt-dlp."""
+def _stream_url_ttl(stream_url):
+    """Seconds the resolved URL stays usable, from its signed ``expire`` field."""
+    query = parse_qs(urlparse(stream_url).query)
+    expire = query.get("expire", [None])[0]
+    if expire is None:
+        match = re.search(r"/expire/(\d+)", stream_url)
+        expire = match.group(1) if match else None
+    if expire is None or not expire.isdigit():
+        return STREAM_URL_CACHE_TTL
+    return min(STREAM_URL_CACHE_TTL, int(expire) - time.time() - STREAM_URL_EXPIRY_MARGIN)
+
+def _stream_url_key(video_url, format_selector):
+    return (extract_video_id(video_url) or video_url, format_selector)
+
+def get_stream_url(video_url, format_selector=STREAM_URL_FORMAT):
+    """Get direct video stream URL using yt-dlp, reusing unexpired resolutions."""
+    key = _stream_url_key(video_url, format_selector)
+    cached = _stream_url_cache.get(key)
+    if cached is not None:
+        return cached
+
     ydl_opts = {
-        'format': 'best[ext=mp4]/best',
+        'format': format_selector,
         'quiet': True,
     }
     
-    with YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=False)
-        return info['url']
+    with span("ytdlp.resolve_stream"):
+        info = ytdlp.extract_info(video_url, ydl_opts)
+    stream_url = info['url']
+
+    ttl = _stream_url_ttl(stream_url)
+    if ttl > 0:
+        _stream_url_cache.set(key, stream_url, ttl)
+    return stream_url
+
+def invalidate_stream_url(video_url, format_selector=STREAM_URL_FORMAT):
+    """Drop a cached stream URL, e.g. after it failed to open."""
+    _stream_url_cache.delete(_stream_url_key(video_url, format_selector))
+
+def dhash(frame, size=8):
+    """64-bit difference hash of a frame, from a downscaled grayscale copy."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+def resize_to_fit(frame, max_dimension):
+    """Downscale a frame so its longest side is at most ``max_dimension``."""
+    height, width = frame.shape[:2]
+    if not max_dimension or max(height, width) <= max_dimension:
+        return frame
+    scale = max_dimension / max(height, width)
+    return cv2.resize(
+        frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+        interpolation=cv2.INTER_AREA,
+    )
+
+@timed("frames.encode")
+def encode_frame(frame, max_dimension=FRAME_MAX_DIMENSION):
+    """Encode a frame with the configured format and quality."""
+    params = []
+    if FRAME_EXTENSION == "jpg":
+        params = [cv2.IMWRITE_JPEG_QUALITY, FRAME_QUALITY]
+    elif FRAME_EXTENSION == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, FRAME_QUALITY]
+    ok, buffer = cv2.imencode(f".{FRAME_EXTENSION}", resize_to_fit(frame, max_dimension), params)
+    if not ok:
+        raise ValueError(f"Could not encode frame as {FRAME_EXTENSION}")
+    return buffer.tobytes()
+
+def thumbnail_filename(filename):
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_thumb{ext}"
+
+def encoding_signature():
+    """Identifies the encoding settings, so stored frames are only reused when they match."""
+    return f"{FRAME_EXTENSION}:q{FRAME_QUALITY}:max{FRAME_MAX_DIMENSION}:thumb{FRAME_THUMBNAIL_SIZE}"
+
+def _write_frame(frame, output_dir, filename, store=None):
+    """Encode and write a frame (plus optional thumbnail); returns its stats.
+
+    With a ``store`` the bytes go into the content-addressed frame store and
+    the stats carry the ``object`` and ``thumbnail_object`` names instead.
+    """
+    start = time.perf_counter()
+    data = encode_frame(frame)
+    encode_ms = (time.perf_counter() - start) * 1000
+    thumbnail_data = encode_frame(frame, FRAME_THUMBNAIL_SIZE) if FRAME_THUMBNAIL_SIZE else None
+    stats = {
+        "encode_ms": round(encode_ms, 2),
+        "bytes": len(data),
+        "thumbnail": thumbnail_filename(filename) if thumbnail_data else None,
+    }
+
+    with span("frames.write"):
+        if store is not None:
+            stats["object"] = store.put(data, FRAME_EXTENSION)
+            stats["thumbnail_object"] = store.put(thumbnail_data, FRAME_EXTENSION) if thumbnail_data else None
+            return stats
+
+        with open(os.path.join(output_dir, filename), "wb") as f:
+            f.write(data)
+        if thumbnail_data:
+            with open(os.path.join(output_dir, stats["thumbnail"]), "wb") as f:
+                f.write(thumbnail_data)
+    return stats
+
+def timestamp_to_seconds(timestamp_str):
+    """Convert an HH:MM:SS or MM:SS timestamp to seconds."""
+    parts = timestamp_str.split(':')
+    if len(parts) == 3:
+        h, m, s = map(int, parts)
+        return h * 3600 + m * 60 + s
+    m, s = map(int, parts)
+    return m * 60 + s
+
+def _read_frames_seek(cap, targets):
+    """Seek to each target independently, in the order given."""
+    for frame_number, item in targets:
+        with span("frames.decode"):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            ret, frame = cap.read()
+        yield item, frame if ret else None
+
+def _read_frames_sequential(cap, targets, seek_threshold_frames):
+    """Walk the stream forward once, grabbing past frames that are not needed.
+
+    Targets are visited in frame order. Gaps longer than ``seek_threshold_frames``
+    are crossed with a seek instead, since decoding that many frames costs more
+    than restarting from the nearest keyframe.
+    """
+    position = 0
+    last_frame_number, last_frame = None, None
 
-def extract_frames_python(stream_url, timestamps, output_dir):
-    """Extract frames using OpenCV."""
+    for frame_number, item in sorted(targets, key=lambda target: target[0]):
+        if frame_number == last_frame_number:
+            yield item, last_frame
+            continue
+
+        with span("frames.decode"):
+            gap = frame_number - position
+            if gap < 0 or gap > seek_threshold_frames:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                position = frame_number
+            else:
+                while position < frame_number and cap.grab():
+                    position += 1
+
+            ret, frame = cap.read() if position == frame_number else (False, None)
+        if ret:
+            position += 1
+        last_frame_number, last_frame = frame_number, frame if ret else None
+        yield item, last_frame
+
+@timed("frames.extract")
+def extract_frames_python(
+    stream_url,
+    timestamps,
+    output_dir,
+    mode=FRAME_EXTRACTION_MODE,
+    on_frame=None,
+    dedup_distance=FRAME_DEDUP_DISTANCE,
+    store=None,
+):
+    """Extract frames using OpenCV, skipping near-duplicates; returns the filenames written.
+
+    ``on_frame`` receives each extracted frame's details and may run on an encoder thread.
+    """
+    cap = None
     try:
-        os.makedirs(output_dir, exist_ok=True)
+        if store is None:
+            os.makedirs(output_dir, exist_ok=True)
         
         # Open video capture
-        cap = cv2.VideoCapture(stream_url)
+        with span("frames.open_stream"):
+            cap = cv2.VideoCapture(stream_url)
         if not cap.isOpened():
             print(f"Error: Could not open video stream")
             return False
@@ -71,45 +274,106 @@ def extract_frames_python(stream_url, timestamps, output_dir):
             print("Warning: Could not determine FPS, using default of 30")
             fps = 30
             
-        frame_filenames = []
-        
-        for timestamp_str, output_filename in timestamps:
-            # Parse timestamp (HH:MM:SS)
-            parts = timestamp_str.split(':')
-            if len(parts) == 3:
-                h, m, s = map(int, parts)
-                seconds = h * 3600 + m * 60 + s
-            else:
-                m, s = map(int, parts)
-                seconds = m * 60 + s
-                
+        targets = []
+        for index, (timestamp_str, output_filename) in enumerate(timestamps):
             # Calculate frame number
-            frame_number = int(seconds * fps)
+            frame_number = int(timestamp_to_seconds(timestamp_str) * fps)
             
             if frame_number >= total_frames:
                 print(f"⚠️ Timestamp {timestamp_str} exceeds video length, skipping")
                 continue
-                
-            # Set position and read frame
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-            ret, frame = cap.read()
-            
-            if ret:
-                output_path = os.path.join(output_dir, output_filename)
-                print(f"🖼️ Extracting frame at {timestamp_str} -> {output_path}")
-                cv2.imwrite(output_path, frame)
-                frame_filenames.append(output_filename)
-            else:
+
+            targets.append((frame_number, (index, timestamp_str, output_filename)))
+
+        if mode == "seek":
+            frames = _read_frames_seek(cap, targets)
+        else:
+            frames = _read_frames_sequential(cap, targets, int(SEEK_THRESHOLD_SECONDS * fps))
+
+        encode_pool = get_executor("encode")
+        # Decoded frames are full resolution; don't let them pile up unencoded
+        max_pending = 2 * encode_pool.workers
+        extracted = []
+        stored_hashes = []
+        pending = []
+        duplicates = []
+
+        def write(index, timestamp_str, output_filename, frame):
+            stats = _write_frame(frame, output_dir, output_filename, store)
+            print(
+                f"🖼️ Extracted frame at {timestamp_str} -> {output_filename} "
+                f"({stats['bytes']} bytes, {stats['encode_ms']:.1f} ms)"
+            )
+            if on_frame is not None:
+                on_frame({"timestamp": timestamp_str, "filename": output_filename, "duplicate": False, **stats})
+            return index, output_filename, stats
+
+        for (index, timestamp_str, output_filename), frame in frames:
+            if frame is None:
                 print(f"❌ Failed to extract frame at {timestamp_str}")
-        
-        # Release resources
-        cap.release()
-        return frame_filenames
+                continue
+
+            duplicate_of = None
+            if dedup_distance >= 0:
+                frame_hash = dhash(frame)
+                duplicate_of = next(
+                    (filename for stored_hash, filename in stored_hashes
+                     if hamming_distance(frame_hash, stored_hash) <= dedup_distance),
+                    None,
+                )
+
+            if duplicate_of is None:
+                if len(pending) >= max_pending:
+                    pending[-max_pending].result()
+                pending.append(encode_pool.submit(write, index, timestamp_str, output_filename, frame))
+                if dedup_distance >= 0:
+                    stored_hashes.append((frame_hash, output_filename))
+            else:
+                print(f"🔁 Frame at {timestamp_str} duplicates {duplicate_of}, not stored again")
+                duplicates.append({"timestamp": timestamp_str, "filename": duplicate_of, "duplicate": True})
+
+        extracted = sorted(future.result() for future in pending)
+        written = {output_filename: stats for _, output_filename, stats in extracted}
+        # Reported once the frames they point at are on disk
+        if on_frame is not None:
+            for duplicate in duplicates:
+                original = written[duplicate["filename"]]
+                on_frame({
+                    **duplicate,
+                    "thumbnail": original["thumbnail"],
+                    "object": original.get("object"),
+                    "thumbnail_object": original.get("thumbnail_object"),
+                })
+        return [output_filename for _, output_filename, _ in extracted]
         
     except Exception as e:
         print(f"Error extracting frames: {str(e)}")
         return []
 
+    finally:
+        # Release resources
+        if cap is not None:
+            cap.release()
+
+def extract_frames_for_video(video_url, timestamps, output_dir, stream_url=None, **kwargs):
+    """Resolve the stream URL and extract frames, re-resolving once if a cached URL fails to open.
+
+    A ``stream_url`` resolved earlier (e.g. by a separate pipeline stage) is
+    tried first and treated like a cached one.
+    """
+    if stream_url is None:
+        stream_url = _stream_url_cache.get(_stream_url_key(video_url, STREAM_URL_FORMAT))
+    # A URL resolved just now failing to open is not fixed by resolving it again
+    reused = stream_url is not None
+    stream_url = stream_url or get_stream_url(video_url)
+    frames = extract_frames_python(stream_url, timestamps, output_dir, **kwargs)
+    if frames is False and reused:
+        print("Stream URL could not be opened, resolving it again")
+        invalidate_stream_url(video_url)
+        stream_url = get_stream_url(video_url)
+        frames = extract_frames_python(stream_url, timestamps, output_dir, **kwargs)
+    return frames
+
 def run(video_url, transcript_text):
     """Main function to extract frames from a video."""
     try:
@@ -121,8 +385,7 @@ def run(video_url, transcript_text):
             print("No visual highlights found in transcript")
             return False
             
-        stream_url = get_stream_url(video_url)
-        extract_frames_python(stream_url, timestamps, output_dir)
+        extract_frames_for_video(video_url, timestamps, output_dir)
         return True
         
     except Exception as e:
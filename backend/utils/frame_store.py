@@ -0,0 +1,93 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FRAME_STORE_DIR = os.getenv("FRAME_STORE_DIR", "frame_store")
+
+
+class FrameStore:
+    """Content-addressed store for encoded frames.
+
+    Objects are named by the SHA-256 of their bytes, so identical frames are
+    written once. A per-video index remembers which object was produced for
+    each timestamp and encoding, letting repeat runs skip decoding entirely.
+    Documents reference objects through hardlinks (copies where the
+    filesystem cannot link).
+    """
+
+    def __init__(self, root: str = FRAME_STORE_DIR):
+        self.root = root
+        self._index_lock = threading.Lock()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, "objects", name[:2], name)
+
+    def put(self, data: bytes, extension: str) -> str:
+        """Store ``data`` and return its object name; existing objects are reused."""
+        name = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        path = self.path(name)
+        if os.path.exists(path):
+            return name
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp creates files private to the owner; frames are served publicly
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        return name
+
+    def link(self, name: str, dest_path: str):
+        """Make ``dest_path`` refer to a stored object."""
+        source = self.path(name)
+        if os.path.exists(dest_path):
+            if os.path.samefile(source, dest_path):
+                return
+            os.remove(dest_path)
+        try:
+            os.link(source, dest_path)
+        except OSError:
+            shutil.copy2(source, dest_path)
+
+    def _index_path(self, video_id: str) -> str:
+        return os.path.join(self.root, "index", f"{video_id}.json")
+
+    def lookup(self, video_id: str, signature: str) -> dict:
+        """Frames previously stored for a video with this encoding, by timestamp."""
+        try:
+            with open(self._index_path(video_id), encoding="utf-8") as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {
+            timestamp: entry
+            for timestamp, entry in index.get(signature, {}).items()
+            if os.path.exists(self.path(entry["object"]))
+        }
+
+    def record(self, video_id: str, signature: str, entries: dict):
+        """Merge ``{timestamp: entry}`` into the video's index."""
+        if not entries:
+            return
+        path = self._index_path(video_id)
+        with self._index_lock:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    index = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                index = {}
+            index.setdefault(signature, {}).update(entries)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, path)
+
+
+frame_store = FrameStore()
@@ -1,9 +1,34 @@
+import os
 import bcrypt
+from dotenv import load_dotenv
+from utils.executors import run_blocking
 
+load_dotenv()
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
 
 
 def check_password(password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password.encode(), hashed_password.encode())
+
+
+def needs_rehash(hashed_password: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    """Whether a stored hash was made with a different cost factor."""
+    try:
+        return int(hashed_password.split("$")[2]) != rounds
+    except (IndexError, ValueError):
+        return True
+
+
+# bcrypt releases the GIL, so the "bcrypt" executor (HASH_WORKERS threads)
+# hashes in parallel without stalling the event loop
+async def hash_password_async(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return await run_blocking("bcrypt", hash_password, password, rounds)
+
+
+async def check_password_async(password: str, hashed_password: str) -> bool:
+    return await run_blocking("bcrypt", check_password, password, hashed_password)
@@ -0,0 +1,128 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+import contextvars
+from dotenv import load_dotenv
+from utils.cache import TieredCache, cache_bypass
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(24 * 3600)))
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """Bounded queue of background jobs drained by a fixed pool of workers.
+
+    Job records live in a ``TieredCache`` so any API worker sharing the same
+    Redis can report status, while execution stays in the submitting process.
+    Workers run in a fresh context; the submitter's ``cache_bypass`` flag is
+    recorded on the job and applied to that job only.
+    """
+
+    def __init__(self, name, handler, workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_SIZE):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.store = TieredCache(f"job:{name}", ttl=JOB_RESULT_TTL, max_entries=max(1024, max_queue * 4))
+        self._queue = None
+        self._tasks = []
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        if self.started:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        # Not the caller's context, which may be a request's with cache bypass set
+        self._tasks = [
+            contextvars.Context().run(asyncio.create_task, self._worker(i), name=f"{self.name}-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logging.info(f"Started {self.workers} worker(s) for job queue '{self.name}'")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: dict) -> dict:
+        await self.start()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "payload": payload,
+            "cache_bypass": cache_bypass.get(),
+            "stages": {},
+            "error": None,
+            "result": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        try:
+            self._queue.put_nowait(job["id"])
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue '{self.name}' is full")
+        await self.store.set(self.store.key(job["id"]), job)
+        return job
+
+    async def get(self, job_id: str):
+        return await self.store.get(self.store.key(job_id))
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _save(self, job):
+        await self.store.set(self.store.key(job["id"]), job)
+
+    async def _worker(self, index):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self.get(job_id)
+                if job is None:
+                    logging.warning(f"Job {job_id} expired before it could run")
+                    continue
+                token = cache_bypass.set(job.get("cache_bypass", False))
+                try:
+                    await self._run(job)
+                finally:
+                    cache_bypass.reset(token)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job):
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        await self._save(job)
+
+        async def progress(stage, status, **detail):
+            job["stages"][stage] = {"status": status, "updated_at": time.time(), **detail}
+            await self._save(job)
+
+        try:
+            job["result"] = await self.handler(job["payload"], progress)
+            job["status"] = "completed"
+        except asyncio.CancelledError:
+            job["status"] = "failed"
+            job["error"] = "Job was cancelled"
+            raise
+        except Exception as e:
+            logging.exception(f"Job {job['id']} failed")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = time.time()
+            await self._save(job)
@@ -0,0 +1,37 @@
+import os
+import logging
+import importlib
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Heavy modules imported in the background at startup, so the first request
+# that needs them does not pay for the import; empty disables warming
+WARM_IMPORTS = [name for name in os.getenv("WARM_IMPORTS", "cv2,numpy,yt_dlp").split(",") if name]
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def warm_imports(names=WARM_IMPORTS):
+    """Import ``names`` now (blocking); failures are logged, not raised."""
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logging.warning(f"Could not preload {name}: {e}")
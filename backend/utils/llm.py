@@ -0,0 +1,249 @@
+import os
+import re
+import time
+import random
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from types import SimpleNamespace
+from dotenv import load_dotenv
+from utils.ratelimit import AsyncRateLimiter, LoopLocal
+from utils.cache import TieredCache
+from utils.executors import run_blocking
+from utils.metrics import span, register_collector
+
+load_dotenv()
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-flash")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_QPS = float(os.getenv("LLM_QPS", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+# Artificial latency for the stub backend, to make benchmarks realistic
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_RETRYABLE_CODES = {429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "InternalServerError",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "BadGateway",
+    "GatewayTimeout",
+}
+
+_models = {}
+_models_lock = threading.Lock()
+_semaphore = LoopLocal(lambda: asyncio.Semaphore(LLM_MAX_CONCURRENCY))
+_limiter = AsyncRateLimiter(LLM_QPS, burst=LLM_MAX_CONCURRENCY)
+
+response_cache = TieredCache(
+    "llm",
+    ttl=LLM_CACHE_TTL,
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    max_bytes=LLM_CACHE_MAX_BYTES,
+    sizeof=lambda value: len(value["text"]),
+    bypassable=True,
+)
+
+stats = {
+    "calls": 0,
+    "errors": 0,
+    "retries": 0,
+    "prompt_tokens": 0,
+    "output_tokens": 0,
+    "latency_seconds": 0.0,
+}
+
+
+def _collect_metrics():
+    return [
+        ("captr_llm_calls_total", "counter", "Successful LLM calls.", [({}, stats["calls"])]),
+        ("captr_llm_errors_total", "counter", "LLM calls that failed after retries.", [({}, stats["errors"])]),
+        ("captr_llm_retries_total", "counter", "Retried LLM calls.", [({}, stats["retries"])]),
+        ("captr_llm_tokens_total", "counter", "LLM tokens by kind.", [
+            ({"kind": "prompt"}, stats["prompt_tokens"]),
+            ({"kind": "output"}, stats["output_tokens"]),
+        ]),
+    ]
+
+
+register_collector(_collect_metrics)
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    model: str
+    latency: float
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    cached: bool = False
+
+
+class StubModel:
+    """Deterministic offline stand-in for ``genai.GenerativeModel``.
+
+    Recognises the prompts this app sends and answers in the shape the
+    callers parse, so the whole pipeline runs without network access.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, generation_config=None):
+        if LLM_STUB_LATENCY_MS:
+            time.sleep(LLM_STUB_LATENCY_MS / 1000)
+        text = self._respond(prompt)
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=len(prompt) // 4,
+                candidates_token_count=len(text) // 4,
+            ),
+        )
+
+    def _respond(self, prompt):
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+        if prompt.startswith("Translate the following"):
+            return prompt.split("\n\n", 1)[-1]
+        if "\nTranscript:\n" in prompt:
+            lines = [
+                line for line in prompt.split("\nTranscript:\n", 1)[1].split("\n")
+                if re.match(r"^\d+:\d{2}\b", line)
+            ]
+            picked = lines[::15] or ["00:00 - stub"]
+            return "\n".join(
+                f"{line.split(' ', 1)[0]} - visual - {line.split('-', 1)[-1].strip()[:60]}"
+                for line in picked
+            )
+        if "YouTube search queries" in prompt:
+            match = re.search(r"topic: '(.*?)'", prompt)
+            topic = match.group(1) if match else digest
+            return f"{topic} tutorial\n{topic} explained\n{topic} examples"
+        match = re.search(r"Topic: (.*)", prompt)
+        subject = match.group(1) if match else next(
+            (line.strip() for line in prompt.split("\n") if line.strip()), ""
+        )
+        return f"- Stub response {digest}\n- {subject[:80]}"
+
+
+def get_model(model_name: str = LLM_MODEL):
+    """Return the shared model client for ``model_name``, creating it once."""
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is not None:
+            return model
+        if LLM_BACKEND == "stub":
+            model = StubModel(model_name)
+        else:
+            import google.generativeai as genai
+
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("Please set the GEMINI_API_KEY environment variable")
+            if not _models:
+                genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(model_name)
+        _models[model_name] = model
+        return model
+
+
+def _is_retryable(exc: Exception) -> bool:
+    code = getattr(exc, "code", None)
+    if isinstance(code, int) and code in _RETRYABLE_CODES:
+        return True
+    return type(exc).__name__ in _RETRYABLE_NAMES
+
+
+def _usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    return (
+        getattr(usage, "prompt_token_count", 0) or 0,
+        getattr(usage, "candidates_token_count", 0) or 0,
+    )
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so prompts differing only in indentation share a key."""
+    return " ".join(prompt.split())
+
+
+def _cache_key(prompt, model_name, generation_config):
+    config = generation_config
+    if config is not None and not isinstance(config, dict):
+        config = getattr(config, "__dict__", str(config))
+    return response_cache.key(
+        model_name, normalize_prompt(prompt), json.dumps(config, sort_keys=True, default=str)
+    )
+
+
+async def generate(
+    prompt: str, model_name: str = LLM_MODEL, generation_config=None, use_cache: bool = True
+) -> LLMResponse:
+    """Generate text, bounded by the global concurrency and QPS limits.
+
+    Responses are cached by model, normalized prompt and generation config.
+    Rate limits and server errors are retried with full-jitter exponential
+    backoff; anything else is raised immediately.
+    """
+    key = _cache_key(prompt, model_name, generation_config)
+    if use_cache:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            return LLMResponse(model=model_name, latency=0.0, cached=True, **cached)
+
+    model = get_model(model_name)
+    kwargs = {"generation_config": generation_config} if generation_config else {}
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        async with _semaphore.get():
+            await _limiter.acquire()
+            start = time.perf_counter()
+            try:
+                with span("llm.generate"):
+                    response = await run_blocking("llm", model.generate_content, prompt, **kwargs)
+                text = response.text
+            except Exception as e:
+                if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                    stats["errors"] += 1
+                    raise
+                error = e
+            else:
+                latency = time.perf_counter() - start
+                prompt_tokens, output_tokens = _usage(response)
+                stats["calls"] += 1
+                stats["prompt_tokens"] += prompt_tokens
+                stats["output_tokens"] += output_tokens
+                stats["latency_seconds"] += latency
+                logging.debug(
+                    f"LLM call to {model_name} took {latency:.2f}s "
+                    f"({prompt_tokens} prompt / {output_tokens} output tokens)"
+                )
+                if use_cache:
+                    await response_cache.set(key, {
+                        "text": text,
+                        "prompt_tokens": prompt_tokens,
+                        "output_tokens": output_tokens,
+                    })
+                return LLMResponse(
+                    text=text,
+                    model=model_name,
+                    latency=latency,
+                    prompt_tokens=prompt_tokens,
+                    output_tokens=output_tokens,
+                )
+
+        stats["retries"] += 1
+        delay = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+        logging.warning(f"LLM call failed ({error}), retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
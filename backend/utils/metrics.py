@@ -0,0 +1,149 @@
+import os
+import time
+import bisect
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+_histograms = {}
+_in_flight = {}
+_errors = {}
+
+# Callables returning extra samples at scrape time, as (name, type, help, [(labels, value)])
+_collectors = []
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(LATENCY_BUCKETS, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+def observe(stage: str, seconds: float):
+    """Record one latency sample for ``stage``."""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = _Histogram()
+        histogram.observe(seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block as ``stage``, tracking it as in flight while it runs.
+
+    Works in sync and async code, including executor threads. Recording is a
+    few counter updates; samples are only formatted when /metrics is scraped.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    with _lock:
+        _in_flight[stage] = _in_flight.get(stage, 0) + 1
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        with _lock:
+            _errors[stage] = _errors.get(stage, 0) + 1
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _in_flight[stage] -= 1
+        observe(stage, elapsed)
+
+
+def timed(stage: str):
+    """Decorator form of ``span`` for sync and async functions."""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def register_collector(collector):
+    _collectors.append(collector)
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        histograms = {
+            stage: (list(h.counts), h.sum, h.count) for stage, h in _histograms.items()
+        }
+        in_flight = dict(_in_flight)
+        errors = dict(_errors)
+
+    lines = [
+        "# HELP captr_stage_duration_seconds Latency of instrumented stages.",
+        "# TYPE captr_stage_duration_seconds histogram",
+    ]
+    for stage, (counts, total, count) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, counts):
+            cumulative += bucket_count
+            lines.append(f'captr_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'captr_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'captr_stage_duration_seconds_sum{{stage="{stage}"}} {total!r}')
+        lines.append(f'captr_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+
+    lines += [
+        "# HELP captr_stage_in_flight Instrumented stages currently running.",
+        "# TYPE captr_stage_in_flight gauge",
+    ]
+    lines += [f'captr_stage_in_flight{{stage="{stage}"}} {value}' for stage, value in sorted(in_flight.items())]
+    lines += [
+        "# HELP captr_stage_errors_total Instrumented stages that raised.",
+        "# TYPE captr_stage_errors_total counter",
+    ]
+    lines += [f'captr_stage_errors_total{{stage="{stage}"}} {value}' for stage, value in sorted(errors.items())]
+
+    for collector in _collectors:
+        for name, kind, help_text, samples in collector():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines += [f"{name}{_labels(labels)} {_format_value(value)}" for labels, value in samples]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,358 @@
+import os
+import asyncio
+import logging
+import threading
+from dotenv import load_dotenv
+from utils import llm
+from utils.cache import TieredCache, cache_bypass, register_cache
+from utils.executors import run_blocking
+from utils.singleflight import SingleFlight, RedisLease
+from utils.metrics import span
+from utils.transcribe import process_video
+from utils.extract_images import (
+    extract_video_id,
+    extract_frames_for_video,
+    encoding_signature,
+    normalize_timestamp,
+    parse_transcript,
+)
+from utils.frame_store import frame_store
+
+load_dotenv()
+
+NOTES_CONCURRENCY = int(os.getenv("NOTES_CONCURRENCY", "4"))
+PIPELINE_RESULT_TTL = int(os.getenv("PIPELINE_RESULT_TTL", "600"))
+
+NOTES_PROMPT = """
+        Create concise educational notes (maximum 150 words) for this concept from a video:
+
+        Topic: {description}
+        Timestamp: {timestamp}
+
+        Your notes should:
+        1. Explain the key concept clearly
+        2. Include only essential points
+        3. Use bullet points where appropriate
+        4. Be under 150 words total
+
+        Format as Markdown.
+        """
+
+SUMMARY_PROMPT = """
+        Create a brief summary (maximum 100 words) of this video content:
+
+        Video topic areas: {topics}
+
+        Include:
+        - Main theme or purpose
+        - 2-3 key takeaways
+        - Keep under 200 words total
+        """
+
+
+async def _no_progress(stage, status, **detail):
+    pass
+
+
+async def _no_events(event, data):
+    pass
+
+
+# One run per video at a time: concurrent callers in this process share the
+# in-flight run, and a Redis lease serializes runs across workers, with the
+# result cached so a worker that waited on the lease can reuse it.
+pipeline_flight = SingleFlight()
+register_cache("pipeline_inflight", pipeline_flight)
+pipeline_results = TieredCache("pipeline", ttl=PIPELINE_RESULT_TTL, bypassable=True)
+
+# Callbacks of every caller currently waiting on a video's run
+_listeners = {}
+
+
+async def run_full_pipeline(
+    video_url: str, progress=None, events=None, highlights: list = None, stream_url: str = None,
+    notes_ready: asyncio.Event = None,
+) -> dict:
+    """Run transcript, frame extraction and note generation for one video.
+
+    ``progress`` is an optional ``async (stage, status, **detail)`` callback
+    invoked as each stage starts and finishes. ``events`` is an optional
+    ``async (event, data)`` callback that receives partial results as soon as
+    they exist: ``highlights``, each ``frame``, each ``note`` and ``summary``.
+
+    ``highlights`` and ``stream_url`` may carry results computed earlier, as
+    the batch pipeline does, to skip those steps. A run started with
+    ``notes_ready`` waits for that event between frames and notes.
+
+    Callers asking for a video that is already being processed join that run
+    and receive its remaining callbacks and its result. The run is cancelled
+    once no caller is waiting for it.
+    """
+    video_id = extract_video_id(video_url)
+    # Cache-bypassing callers get their own run, see SingleFlight
+    flight = (video_id, cache_bypass.get())
+    listener = (progress or _no_progress, events or _no_events)
+    _listeners.setdefault(flight, []).append(listener)
+    try:
+        return await pipeline_flight.do(
+            video_id, _run_exclusive, video_url, flight, highlights, stream_url, notes_ready
+        )
+    finally:
+        listeners = _listeners.get(flight, [])
+        listeners.remove(listener)
+        if not listeners:
+            _listeners.pop(flight, None)
+            pipeline_flight.cancel(video_id)
+
+
+async def _run_exclusive(
+    video_url: str, flight: tuple, highlights: list, stream_url: str, notes_ready: asyncio.Event,
+) -> dict:
+    video_id = flight[0]
+
+    async def progress(stage, status, **detail):
+        for listener_progress, _ in list(_listeners.get(flight, ())):
+            await listener_progress(stage, status, **detail)
+
+    async def events(event, data):
+        for _, listener_events in list(_listeners.get(flight, ())):
+            await listener_events(event, data)
+
+    key = pipeline_results.key(video_id)
+    async with RedisLease(f"pipeline:{video_id}") as lease:
+        if lease.waited:
+            result = await pipeline_results.get(key)
+            if result is not None:
+                return result
+        result = await _run_full_pipeline(
+            video_url, video_id, progress, events, highlights, stream_url, notes_ready
+        )
+        await pipeline_results.set(key, result)
+        return result
+
+
+async def _run_full_pipeline(
+    video_url: str, video_id: str, progress, events, transcript_highlights: list, stream_url: str,
+    notes_ready: asyncio.Event = None,
+) -> dict:
+    # Get transcript and highlights
+    if transcript_highlights is None:
+        await progress("transcript", "running")
+        with span("pipeline.transcript"):
+            transcript_data = await process_video(video_url)
+        transcript_highlights = transcript_data["highlights"]
+        await progress("transcript", "completed", highlights=len(transcript_highlights))
+    await events("highlights", {"video_id": video_id, "highlights": transcript_highlights})
+
+    document_folder, images_folder = document_folders(video_id)
+
+    # Extract frames based on highlights
+    await progress("frames", "running")
+    with span("pipeline.frames"):
+        frames_by_timestamp, frame_stats = await extract_document_frames(
+            video_url, video_id, transcript_highlights, images_folder, events, stream_url
+        )
+    await progress("frames", "completed", **frame_stats)
+    if notes_ready is not None:
+        await notes_ready.wait()
+
+    with span("pipeline.document"):
+        return await write_document(
+            video_url, video_id, transcript_highlights, frames_by_timestamp, document_folder, progress, events
+        )
+
+
+def document_folders(video_id: str) -> tuple:
+    """Create and return the research document folder and its images subfolder."""
+    # Create a dedicated folder for this research document
+    docs_dir = "research_documents"
+    os.makedirs(docs_dir, exist_ok=True)
+
+    document_folder = os.path.join(docs_dir, f"{video_id}_research")
+    os.makedirs(document_folder, exist_ok=True)
+
+    # Create images subfolder
+    images_folder = os.path.join(document_folder, "images")
+    os.makedirs(images_folder, exist_ok=True)
+    return document_folder, images_folder
+
+
+def _frame_timestamps(transcript_highlights: list) -> list:
+    formatted_transcript = "\n".join([
+        f"{item['timestamp']} - visual - {item['description']}"
+        for item in transcript_highlights
+    ])
+    return parse_transcript(formatted_transcript)
+
+
+async def frames_stored(video_id: str, transcript_highlights: list) -> bool:
+    """Whether the frame store already holds every frame these highlights need."""
+    stored_frames = await run_blocking("frame_store", frame_store.lookup, video_id, encoding_signature())
+    return all(timestamp in stored_frames for timestamp, _ in _frame_timestamps(transcript_highlights))
+
+
+async def extract_document_frames(
+    video_url: str, video_id: str, transcript_highlights: list, images_folder: str,
+    events=_no_events, stream_url: str = None,
+) -> tuple:
+    """Extract one frame per highlight and link it into ``images_folder``.
+
+    Returns ``(frames_by_timestamp, frame_stats)``. ``stream_url`` may carry
+    an already resolved stream to skip the yt-dlp lookup.
+    """
+    timestamps = _frame_timestamps(transcript_highlights)
+
+    # Frames go straight into the content-addressed store and are linked into
+    # the document as soon as they exist; ones stored by an earlier run of the
+    # same video and encoding are reused without decoding anything.
+    loop = asyncio.get_running_loop()
+    signature = encoding_signature()
+    stored_frames = await run_blocking("frame_store", frame_store.lookup, video_id, signature)
+    new_frames = {}
+    frames_by_timestamp = {}
+    frame_stats = {"bytes": 0, "encode_ms": 0.0, "reused": 0}
+    # on_frame runs on the encoder and frame_store threads
+    stats_lock = threading.Lock()
+
+    def on_frame(frame, reused=False):
+        frame_store.link(frame["object"], os.path.join(images_folder, frame["filename"]))
+        if frame.get("thumbnail_object"):
+            frame_store.link(frame["thumbnail_object"], os.path.join(images_folder, frame["thumbnail"]))
+        with stats_lock:
+            if reused:
+                frame_stats["reused"] += 1
+            else:
+                new_frames[frame["timestamp"]] = {
+                    key: frame.get(key) for key in ("filename", "object", "thumbnail", "thumbnail_object")
+                }
+                if not frame["duplicate"]:
+                    frame_stats["bytes"] += frame["bytes"]
+                    frame_stats["encode_ms"] += frame["encode_ms"]
+            frames_by_timestamp[frame["timestamp"]] = frame["filename"]
+        event = {**frame, "path": f"images/{frame['filename']}"}
+        if frame.get("thumbnail"):
+            event["thumbnail_path"] = f"images/{frame['thumbnail']}"
+        asyncio.run_coroutine_threadsafe(events("frame", event), loop)
+
+    reused = [(t, stored_frames[t]) for t, _ in timestamps if t in stored_frames]
+    missing = [(t, filename) for t, filename in timestamps if t not in stored_frames]
+
+    def link_reused():
+        for timestamp, entry in reused:
+            on_frame({"timestamp": timestamp, "duplicate": False, **entry}, reused=True)
+
+    try:
+        if reused:
+            await run_blocking("frame_store", link_reused)
+        if missing:
+            frames = await run_blocking(
+                "frames", extract_frames_for_video, video_url, missing, None,
+                on_frame=on_frame, store=frame_store, stream_url=stream_url,
+            )
+            if frames is False:
+                raise RuntimeError("Could not open the video stream")
+    except Exception as e:
+        logging.exception(f"Frame extraction failed for {video_id}")
+        raise RuntimeError(f"Frame extraction failed: {e}") from e
+    finally:
+        # Encoder threads may still be adding frames after a timeout
+        with stats_lock:
+            recorded = dict(new_frames)
+        await run_blocking("frame_store", frame_store.record, video_id, signature, recorded)
+    frame_stats["frames"] = len(set(frames_by_timestamp.values()))
+    frame_stats["encode_ms"] = round(frame_stats["encode_ms"], 2)
+    return frames_by_timestamp, frame_stats
+
+
+async def write_document(
+    video_url: str, video_id: str, transcript_highlights: list, frames_by_timestamp: dict,
+    document_folder: str, progress=_no_progress, events=_no_events,
+) -> dict:
+    """Generate notes and summary, save the markdown document and return the result."""
+    # Generate markdown with local image references
+    markdown = f"# Research Document: {video_id}\n\n"
+    markdown += f"Video URL: {video_url}\n\n"
+
+    copied_images = []
+    sections = []
+
+    for i, highlight in enumerate(transcript_highlights):
+        section = f"## {i+1}. {highlight['description']}\n\n"
+        section += f"Timestamp: {highlight['timestamp']}\n\n"
+
+        # Find matching frame
+        frame_filename = frames_by_timestamp.get(normalize_timestamp(highlight['timestamp']))
+        if frame_filename:
+            # Near-duplicate frames share one image across highlights
+            if frame_filename not in copied_images:
+                copied_images.append(frame_filename)
+
+            # Add image reference to markdown (using relative path)
+            section += f"![{highlight['description']}](images/{frame_filename})\n\n"
+
+        sections.append(section)
+
+    # Generate the summary and concise per-highlight notes with Gemini concurrently
+    await progress("notes", "running", completed=0, total=len(transcript_highlights))
+    await progress("summary", "running")
+    semaphore = asyncio.Semaphore(NOTES_CONCURRENCY)
+    completed = 0
+
+    async def generate(prompt):
+        async with semaphore:
+            response = await llm.generate(prompt)
+            return response.text
+
+    async def generate_notes(index, highlight):
+        nonlocal completed
+        try:
+            note = await generate(NOTES_PROMPT.format(**highlight))
+        except Exception as e:
+            logging.error(f"Error generating notes: {str(e)}")
+            note = None
+        completed += 1
+        await progress("notes", "running", completed=completed, total=len(transcript_highlights))
+        section = sections[index] + (
+            f"{note}\n\n" if note is not None else "Notes unavailable for this segment.\n\n"
+        ) + "---\n\n"
+        await events("note", {"index": index, "timestamp": highlight["timestamp"], "markdown": section})
+        return section
+
+    async def generate_summary():
+        prompt = SUMMARY_PROMPT.format(
+            topics=', '.join([h['description'] for h in transcript_highlights])
+        )
+        try:
+            summary = f"## Summary\n\n{await generate(prompt)}\n\n"
+        except Exception as e:
+            logging.error(f"Error generating summary: {str(e)}")
+            summary = ""
+        await progress("summary", "completed")
+        await events("summary", {"markdown": summary})
+        return summary
+
+    summary_task = asyncio.create_task(generate_summary())
+    notes = await asyncio.gather(
+        *(generate_notes(i, highlight) for i, highlight in enumerate(transcript_highlights))
+    )
+    await progress("notes", "completed", total=len(transcript_highlights))
+
+    markdown += "".join(notes)
+    markdown += await summary_task
+
+    # Save markdown to file with video ID as filename
+    markdown_filename = f"{video_id}.md"
+    markdown_path = os.path.join(document_folder, markdown_filename)
+
+    with open(markdown_path, 'w', encoding='utf-8') as md_file:
+        md_file.write(markdown)
+
+    return {
+        "video_id": video_id,
+        "url": video_url,
+        "transcript_highlights": transcript_highlights,
+        "frames_directory": document_folder,
+        "extracted_frames": copied_images,
+        "markdown_document": markdown,
+        "status": "completed",
+    }
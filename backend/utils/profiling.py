@@ -0,0 +1,229 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import cProfile
+import logging
+import threading
+import traceback
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+from utils.executors import run_blocking
+from utils.metrics import observe, register_collector
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # Optional; falls back to cProfile
+    Profiler = None
+
+load_dotenv()
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Fraction of requests profiled automatically
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Lets clients ask for a profile with "X-Profile: 1"; keep off where clients are untrusted
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() == "true"
+
+LOOP_LAG_MONITOR = os.getenv("LOOP_LAG_MONITOR", "false").lower() == "true"
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "50"))
+
+
+# Profilers hook the interpreter globally, so one request is profiled at a time
+_profiling = threading.Lock()
+
+
+def should_profile(headers) -> bool:
+    if PROFILE_HEADER_ENABLED and headers.get("X-Profile", "").lower() in ("1", "true"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class ProfilingMiddleware:
+    """ASGI middleware running selected requests under a ``RequestProfiler``.
+
+    The profile covers the request until its response headers are sent, so
+    streaming responses are profiled up to their first byte, and the saved
+    file is named in the ``X-Profile-File`` response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not should_profile(Headers(scope=scope))
+            or not _profiling.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = RequestProfiler(scope["method"], scope["path"])
+        stopped = False
+
+        async def stop():
+            nonlocal stopped
+            if stopped:
+                return
+            stopped = True
+            try:
+                await profiler.stop()
+            finally:
+                _profiling.release()
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                await stop()
+                if profiler.path is not None:
+                    MutableHeaders(scope=message).append("X-Profile-File", os.path.basename(profiler.path))
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            await stop()
+
+
+class RequestProfiler:
+    """Profile a block and save the result under ``PROFILE_DIR``.
+
+    Uses pyinstrument when installed (an HTML call tree), otherwise cProfile
+    (a ``.prof`` file for pstats/snakeviz). Both see everything the event
+    loop runs meanwhile, not only this request. The profile is rendered and
+    written on the "profile" executor, not on the event loop.
+    """
+
+    def __init__(self, method: str, path: str):
+        slug = path.strip("/").replace("/", "_") or "root"
+        self.name = f"{time.strftime('%Y%m%d-%H%M%S')}_{method}_{slug}_{random.randrange(16 ** 6):06x}"
+        self.path = None
+        self._profiler = None
+
+    def start(self):
+        if Profiler is not None:
+            self._profiler = Profiler(async_mode="disabled")
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    async def stop(self):
+        # Stopped on the loop thread, where it was started
+        if Profiler is not None:
+            self._profiler.stop()
+            self.path = os.path.join(PROFILE_DIR, f"{self.name}.html")
+        else:
+            self._profiler.disable()
+            self.path = os.path.join(PROFILE_DIR, f"{self.name}.prof")
+        try:
+            await run_blocking("profile", self._save)
+        except Exception as e:
+            logging.error(f"Could not save request profile to {self.path}: {e}")
+            self.path = None
+        else:
+            logging.info(f"Saved request profile to {self.path}")
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+        return False
+
+    def _save(self):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if Profiler is not None:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.dump_stats(self.path)
+
+
+class LoopLagMonitor:
+    """Detect callbacks that block the event loop.
+
+    A heartbeat task records when the loop last ran and how late each beat
+    was. A watchdog thread notices when no beat arrived for longer than the
+    threshold and logs the stack the loop thread is executing at that moment,
+    which is the code responsible for the stall.
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_LAG_THRESHOLD_MS, interval_ms: float = LOOP_LAG_INTERVAL_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat(), name="loop-lag-heartbeat")
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+        logging.info(f"Event loop lag monitor started (threshold {self.threshold * 1000:.0f} ms)")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            self.max_lag_ms = max(self.max_lag_ms, lag * 1000)
+            observe("event_loop.lag", lag)
+
+    def _watch(self):
+        stalled_since = None
+        while not self._stopped.wait(self.interval / 2):
+            since_beat = time.monotonic() - self._last_beat
+            if since_beat <= self.interval + self.threshold:
+                if stalled_since is not None:
+                    logging.warning(
+                        f"Event loop was blocked for {(time.monotonic() - stalled_since) * 1000:.0f} ms"
+                    )
+                    stalled_since = None
+                continue
+            if stalled_since is None:
+                stalled_since = self._last_beat + self.interval
+                self.stalls += 1
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>\n"
+                logging.warning(
+                    f"Event loop blocked for over {self.threshold * 1000:.0f} ms; "
+                    f"the loop thread is running:\n{stack}"
+                )
+
+    def stats(self) -> dict:
+        return {"stalls": self.stalls, "max_lag_ms": round(self.max_lag_ms, 2), "running": self._task is not None}
+
+
+loop_monitor = LoopLagMonitor()
+
+
+def _collect_metrics():
+    return [
+        ("captr_event_loop_stalls_total", "counter", "Times the event loop was blocked past the threshold.",
+         [({}, loop_monitor.stalls)]),
+    ]
+
+
+register_collector(_collect_metrics)
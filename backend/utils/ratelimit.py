@@ -0,0 +1,61 @@
+import time
+import asyncio
+import weakref
+import threading
+
+
+class LoopLocal:
+    """One asyncio primitive per running event loop, created on first use.
+
+    Locks and semaphores bind to the loop that first waits on them, so a
+    module-level one breaks callers that run more than one loop, such as
+    repeated ``asyncio.run`` calls.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instances = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            instance = self._instances.get(loop)
+            if instance is None:
+                instance = self._instances[loop] = self._factory()
+            return instance
+
+
+class AsyncRateLimiter:
+    """Token bucket limiting how many operations start per second.
+
+    ``rate`` is the sustained number of acquisitions per second and ``burst``
+    how many may start back to back. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = LoopLocal(asyncio.Lock)
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock.get():
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
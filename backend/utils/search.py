@@ -2,32 +2,50 @@ import os
 import asyncio
 import json
 from dotenv import load_dotenv
-import google.generativeai as genai
-import yt_dlp
+from utils import llm, ytdlp
+from utils.executors import run_blocking
+from utils.cache import TieredCache, register_cache
+from utils.singleflight import SingleFlight
+from utils.metrics import timed
 
+load_dotenv()
 
-async def get_youtube_search_queries(user_prompt, model_name="gemini-1.5-flash"):
-    """Generate YouTube search queries using Gemini."""
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "900"))
+
+search_cache = TieredCache("search", ttl=SEARCH_CACHE_TTL, bypassable=True)
+search_flight = SingleFlight()
+register_cache("search_inflight", search_flight)
+
+
+def normalize_search_text(text):
+    """Case- and whitespace-insensitive form of a prompt or query."""
+    return " ".join(text.lower().split())
 
-    load_dotenv()
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-    if not GEMINI_API_KEY:
-        raise ValueError("Please set the GEMINI_API_KEY environment variable")
+async def get_youtube_search_queries(user_prompt, model_name=llm.LLM_MODEL):
+    """Generate YouTube search queries, shared across equivalent prompts."""
+    key = search_cache.key("queries", model_name, normalize_search_text(user_prompt))
+    search_queries = await search_cache.get(key)
+    if search_queries is None:
+        search_queries = await search_flight.do(
+            key, _generate_search_queries, user_prompt, model_name
+        )
+        # An empty list means the model gave nothing usable; ask again next time
+        if search_queries:
+            await search_cache.set(key, search_queries)
+    return search_queries
+
 
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel(model_name)
+@timed("search.queries")
+async def _generate_search_queries(user_prompt, model_name):
+    """Generate YouTube search queries using Gemini."""
 
     gemini_prompt = (
         f"List only 3 concise YouTube search queries to explore the topic: '{user_prompt}'. "
         "Do not include any preamble or extra formatting — just return the 3 search phrases as plain lines."
     )
 
-    # Run synchronous Gemini API call in executor to prevent blocking
-    loop = asyncio.get_running_loop()
-    response = await loop.run_in_executor(
-        None, lambda: model.generate_content(gemini_prompt)
-    )
+    response = await llm.generate(gemini_prompt, model_name=model_name)
 
     search_queries = [
         line.strip()
@@ -39,6 +57,19 @@ async def get_youtube_search_queries(user_prompt, model_name="gemini-1.5-flash")
 
 
 async def search_youtube_video(query, max_results=3):
+    """Search YouTube for a single query, sharing cached and in-flight results."""
+    key = search_cache.key("videos", normalize_search_text(query), max_results)
+    videos = await search_cache.get(key)
+    if videos is None:
+        videos = await search_flight.do(key, _search_youtube_video, query, max_results)
+        # Empty results usually mean the search failed, so retry them next time
+        if videos:
+            await search_cache.set(key, videos)
+    return videos
+
+
+@timed("search.youtube")
+async def _search_youtube_video(query, max_results):
     """Asynchronously search YouTube videos for a single query."""
     try:
         ydl_opts = {
@@ -52,10 +83,9 @@ async def search_youtube_video(query, max_results=3):
 
         search_query = f"ytsearch{max_results}:{query}"
 
-        # Run yt-dlp in an executor to prevent blocking the event loop
-        loop = asyncio.get_running_loop()
-        results = await loop.run_in_executor(
-            None, lambda: extract_info_with_ytdlp(search_query, ydl_opts)
+        # Run yt-dlp on its own executor to prevent blocking the event loop
+        results = await run_blocking(
+            "ytdlp", extract_info_with_ytdlp, search_query, ydl_opts
         )
 
         videos = []
@@ -78,8 +108,7 @@ async def search_youtube_video(query, max_results=3):
 
 def extract_info_with_ytdlp(url, options):
     """Extract info using yt-dlp (synchronous function to be run in executor)"""
-    with yt_dlp.YoutubeDL(options) as ydl:
-        return ydl.extract_info(url, download=False)
+    return ytdlp.extract_info(url, options)
 
 
 async def search_youtube_videos(search_queries, max_results=3):
@@ -0,0 +1,161 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+import contextvars
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from utils.cache import cache_bypass, get_redis
+
+load_dotenv()
+
+LOCK_LEASE_SECONDS = int(os.getenv("LOCK_LEASE_SECONDS", "60"))
+LOCK_WAIT_TIMEOUT = int(os.getenv("LOCK_WAIT_TIMEOUT", "1800"))
+
+# Delete/extend the lock only while it still holds our token
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same result (or exception) instead of repeating it.
+    Callers bypassing caches never share a call with ones that do not, and
+    the work runs in a fresh context holding only that ``cache_bypass`` flag,
+    so the first caller's other context variables do not leak into it.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        bypass = cache_bypass.get()
+        flight = (key, bypass)
+        future = self._inflight.get(flight)
+        if future is None:
+            self.started += 1
+            context = contextvars.Context()
+            context.run(cache_bypass.set, bypass)
+            future = context.run(asyncio.ensure_future, fn(*args, **kwargs))
+            self._inflight[flight] = future
+            future.add_done_callback(lambda _: self._inflight.pop(flight, None))
+        else:
+            self.shared += 1
+        # Shielded so one caller disconnecting does not cancel the others
+        return await asyncio.shield(future)
+
+    def cancel(self, key):
+        """Cancel the caller's in-flight call for ``key``, e.g. once nobody awaits it."""
+        future = self._inflight.get((key, cache_bypass.get()))
+        if future is not None:
+            future.cancel()
+
+    def stats(self) -> dict:
+        return {"started": self.started, "shared": self.shared, "in_flight": len(self._inflight)}
+
+
+class KeyedLock:
+    """One ``asyncio.Lock`` per key, dropped once nobody holds or awaits it.
+
+    For work that cannot be coalesced into a single call, e.g. because
+    concurrent callers each want a different part of it: they run one after
+    another, and each can skip what the previous ones already did.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self.acquired = 0
+        self.waited = 0
+
+    @asynccontextmanager
+    async def hold(self, key):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        lock = entry[0]
+        entry[1] += 1
+        try:
+            if lock.locked():
+                self.waited += 1
+            async with lock:
+                self.acquired += 1
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    def stats(self) -> dict:
+        return {"acquired": self.acquired, "waited": self.waited, "in_flight": len(self._locks)}
+
+
+class RedisLease:
+    """Cross-process lock held through a Redis key with a renewed lease.
+
+    The holder extends the lease while it works, so a crashed worker frees
+    the lock within ``lease`` seconds. ``waited`` tells the new holder whether
+    someone else held the lock first (and may have produced its result).
+    Without Redis, or if Redis fails, it degrades to a no-op.
+    """
+
+    def __init__(self, name: str, lease: float = LOCK_LEASE_SECONDS, wait_timeout: float = LOCK_WAIT_TIMEOUT):
+        self.key = f"captr:lock:{name}"
+        self.lease = lease
+        self.wait_timeout = wait_timeout
+        self.waited = False
+        self._redis = get_redis()
+        self._token = uuid.uuid4().hex
+        self._renewal = None
+        self._held = False
+
+    async def __aenter__(self):
+        if self._redis is None:
+            return self
+        deadline = time.monotonic() + self.wait_timeout
+        try:
+            while not await self._redis.set(self.key, self._token, nx=True, px=int(self.lease * 1000)):
+                self.waited = True
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for lock {self.key}")
+                await asyncio.sleep(0.25)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            logging.warning(f"Redis lock {self.key} unavailable, continuing without it: {e}")
+            return self
+        self._held = True
+        self._renewal = asyncio.create_task(self._renew())
+        return self
+
+    async def _renew(self):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await self._redis.eval(_RENEW_SCRIPT, 1, self.key, self._token, int(self.lease * 1000))
+            except Exception as e:
+                logging.warning(f"Could not renew lock {self.key}: {e}")
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if not self._held:
+            return False
+        self._renewal.cancel()
+        try:
+            await self._redis.eval(_RELEASE_SCRIPT, 1, self.key, self._token)
+        except Exception as e:
+            logging.warning(f"Could not release lock {self.key}: {e}")
+        return False
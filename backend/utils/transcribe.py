@@ -9,21 +9,57 @@ from youtube_transcript_api import (
     TranscriptsDisabled,
     NoTranscriptFound,
 )
-import google.generativeai as genai
+from utils import llm
+from utils.cache import TieredCache
+from utils.executors import run_blocking
+from utils.metrics import span, timed
 
 # Timestamp format for logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
 )
 load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-if not GEMINI_API_KEY:
-    logging.error("GEMINI_API_KEY not found in .env file")
-    sys.exit(1)
+# Bump when the analysis prompt changes so cached highlights are not reused
+ANALYSIS_PROMPT_VERSION = "3"
 
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Long transcripts are analyzed as overlapping, time-aligned chunks
+ANALYSIS_CHUNK_SECONDS = int(os.getenv("ANALYSIS_CHUNK_SECONDS", "600"))
+ANALYSIS_CHUNK_OVERLAP_SECONDS = int(os.getenv("ANALYSIS_CHUNK_OVERLAP_SECONDS", "60"))
+ANALYSIS_CHUNK_MAX_CHARS = int(os.getenv("ANALYSIS_CHUNK_MAX_CHARS", "15000"))
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "4"))
+# Highlights of the same type closer than this are treated as duplicates
+HIGHLIGHT_DEDUP_SECONDS = int(os.getenv("HIGHLIGHT_DEDUP_SECONDS", "20"))
+
+# Translation is split on segment boundaries into chunks of this many characters
+TRANSLATION_CHUNK_CHARS = int(os.getenv("TRANSLATION_CHUNK_CHARS", "6000"))
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+TRANSLATION_PROMPT_VERSION = "1"
+
+# In-process bytes per cache, so long transcripts cannot crowd out memory
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+HIGHLIGHTS_CACHE_MAX_BYTES = int(os.getenv("HIGHLIGHTS_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+TRANSLATION_CACHE_MAX_BYTES = int(os.getenv("TRANSLATION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_timestamp_regex = re.compile(r"^\s*<?(?:(\d+):)?(\d+):(\d{2})\b")
+
+
+def _transcript_size(value) -> int:
+    # [transcript_data, lang_code, needs_translation]; ~32 bytes per segment for start/duration
+    return sum(len(entry["text"]) + 32 for entry in value[0])
+
+
+def _highlights_size(value) -> int:
+    return sum(len(item["timestamp"]) + len(item["description"]) for item in value)
+
+
+transcript_cache = TieredCache(
+    "transcript", max_bytes=TRANSCRIPT_CACHE_MAX_BYTES, sizeof=_transcript_size, bypassable=True
+)
+highlights_cache = TieredCache(
+    "highlights", max_bytes=HIGHLIGHTS_CACHE_MAX_BYTES, sizeof=_highlights_size, bypassable=True
+)
+translation_cache = TieredCache("translation", max_bytes=TRANSLATION_CACHE_MAX_BYTES, bypassable=True)
 
 
 def extract_video_id(url: str) -> str:
@@ -36,38 +72,43 @@ def extract_video_id(url: str) -> str:
         raise ValueError(f"Invalid YouTube URL format: {url}")
 
 
-async def fetch_transcript_with_language_fallback(video_id: str) -> tuple:
-    """Fetch transcript with language fallback and translation if needed."""
-    logging.info(f"Fetching transcript for video ID: {video_id}")
-    try:
-
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+def _fetch_transcript_sync(video_id: str) -> tuple:
+    """Blocking transcript lookup; run on the "transcript" executor."""
+    transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
 
-        try:
-            english_transcript = transcript_list.find_transcript(["en"])
-            transcript_data = english_transcript.fetch()
-            logging.info(f"Found English transcript for video ID: {video_id}")
-            return transcript_data, "en", False
+    try:
+        english_transcript = transcript_list.find_transcript(["en"])
+        transcript_data = english_transcript.fetch()
+        logging.info(f"Found English transcript for video ID: {video_id}")
+        return transcript_data, "en", False
+
+    except NoTranscriptFound:
+        available_transcript = next(
+            transcript_list._manually_created_transcripts.values().__iter__(), None
+        )
 
-        except NoTranscriptFound:
+        if not available_transcript:
             available_transcript = next(
-                transcript_list._manually_created_transcripts.values().__iter__(), None
+                transcript_list._generated_transcripts.values().__iter__(), None
             )
 
-            if not available_transcript:
-                available_transcript = next(
-                    transcript_list._generated_transcripts.values().__iter__(), None
-                )
-
-            if available_transcript:
-                lang_code = available_transcript.language_code
-                transcript_data = available_transcript.fetch()
-                logging.info(
-                    f"Found transcript in {lang_code} for video ID: {video_id}"
-                )
-                return transcript_data, lang_code, True
-            else:
-                raise NoTranscriptFound(video_id)
+        if available_transcript:
+            lang_code = available_transcript.language_code
+            transcript_data = available_transcript.fetch()
+            logging.info(
+                f"Found transcript in {lang_code} for video ID: {video_id}"
+            )
+            return transcript_data, lang_code, True
+        else:
+            raise NoTranscriptFound(video_id)
+
+
+async def fetch_transcript_with_language_fallback(video_id: str) -> tuple:
+    """Fetch transcript with language fallback and translation if needed."""
+    logging.info(f"Fetching transcript for video ID: {video_id}")
+    try:
+        with span("transcript.fetch"):
+            return await run_blocking("transcript", _fetch_transcript_sync, video_id)
 
     except (TranscriptsDisabled, NoTranscriptFound) as e:
         logging.error(f"No transcripts available for video ID: {video_id}. Error: {e}")
@@ -77,36 +118,71 @@ async def fetch_transcript_with_language_fallback(video_id: str) -> tuple:
         raise RuntimeError(f"Transcript fetch failed: {e}")
 
 
-async def translate_transcript(transcript_data, source_lang):
-    """Translate non-English transcript to English using Gemini."""
-    logging.info(f"Translating transcript from {source_lang} to English")
-
-    transcript_text = "\n".join(
-        [
-            f"{int(entry['start'])//60:02d}:{int(entry['start'])%60:02d} - {entry['text']}"
-            for entry in transcript_data
-        ]
-    )[:15000]
+def _chunk_lines(lines: list[str], max_chars: int) -> list[str]:
+    """Group whole lines into chunks of at most ``max_chars`` characters."""
+    chunks = []
+    current = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+async def _translate_chunk(chunk_text: str, source_lang: str) -> str:
+    key = translation_cache.key(source_lang, TRANSLATION_PROMPT_VERSION, chunk_text)
+    cached = await translation_cache.get(key)
+    if cached is not None:
+        return cached
 
     prompt = (
         f"Translate the following video transcript from {source_lang} to English. "
         "Maintain the timestamp format at the beginning of each line.\n\n"
-        f"{transcript_text}"
+        f"{chunk_text}"
     )
 
-    try:
-        loop = asyncio.get_running_loop()
-        response = await loop.run_in_executor(
-            None, lambda: model.generate_content(prompt)
-        )
+    response = await llm.generate(prompt)
+    translated_text = response.text.strip()
+    await translation_cache.set(key, translated_text)
+    return translated_text
 
-        translated_text = response.text.strip()
-        logging.info(f"Translation completed successfully")
 
-        return translated_text
-    except Exception as e:
-        logging.exception("Failed to translate transcript")
-        raise RuntimeError(f"Translation failed: {e}")
+@timed("transcript.translate")
+async def translate_transcript(transcript_data, source_lang):
+    """Translate non-English transcript to English using Gemini."""
+    lines = [
+        f"{int(entry['start'])//60:02d}:{int(entry['start'])%60:02d} - {entry['text']}"
+        for entry in transcript_data
+    ]
+    chunks = _chunk_lines(lines, TRANSLATION_CHUNK_CHARS)
+    logging.info(
+        f"Translating transcript from {source_lang} to English in {len(chunks)} chunk(s)"
+    )
+    semaphore = asyncio.Semaphore(TRANSLATION_CONCURRENCY)
+
+    async def translate(chunk):
+        async with semaphore:
+            return await _translate_chunk(chunk, source_lang)
+
+    # Successful chunks are cached, so a retry only re-translates the failures
+    results = await asyncio.gather(
+        *(translate(chunk) for chunk in chunks), return_exceptions=True
+    )
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        logging.error(
+            f"Failed to translate {len(failures)} of {len(chunks)} chunk(s): {failures[0]}"
+        )
+        raise RuntimeError(f"Translation failed: {failures[0]}")
+
+    logging.info(f"Translation completed successfully")
+    return "\n".join(results)
 
 
 async def format_transcript(transcript_data, needs_translation=False, source_lang=None):
@@ -123,8 +199,129 @@ async def format_transcript(transcript_data, needs_translation=False, source_lan
         return "\n".join(lines)
 
 
-async def analyze_visual_segments(transcript_text: str) -> list[dict]:
-    logging.info("Sending to Gemini for analysis")
+def timestamp_seconds(text: str):
+    """Seconds for a leading ``MM:SS`` or ``HH:MM:SS`` timestamp, or None."""
+    match = _timestamp_regex.match(text)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def split_transcript(
+    transcript_text: str,
+    chunk_seconds: int = ANALYSIS_CHUNK_SECONDS,
+    overlap_seconds: int = ANALYSIS_CHUNK_OVERLAP_SECONDS,
+    max_chars: int = ANALYSIS_CHUNK_MAX_CHARS,
+) -> list[str]:
+    """Split ``MM:SS - text`` lines into overlapping chunks on line boundaries.
+
+    A chunk ends once it spans ``chunk_seconds`` or reaches ``max_chars``. When
+    it ended on time, the next one starts up to ``overlap_seconds`` before that
+    point, but always at least halfway into this chunk so chunks keep moving
+    forward. Lines without a timestamp inherit the previous line's time.
+    """
+    entries = []
+    current = 0
+    for line in transcript_text.split("\n"):
+        seconds = timestamp_seconds(line)
+        if seconds is not None:
+            current = seconds
+        entries.append((current, line))
+
+    chunks = []
+    i = 0
+    while i < len(entries):
+        start = entries[i][0]
+        j = i
+        chars = 0
+        while j < len(entries) and (
+            j == i
+            or (entries[j][0] - start < chunk_seconds
+                and chars + len(entries[j][1]) <= max_chars)
+        ):
+            chars += len(entries[j][1]) + 1
+            j += 1
+        chunks.append("\n".join(line for _, line in entries[i:j]))
+        if j >= len(entries):
+            break
+        if entries[j][0] - start < chunk_seconds:
+            # Ended on max_chars; overlapping would only resend the same text
+            i = j
+            continue
+
+        # Step back so the next chunk repeats the tail of this one
+        k = j
+        floor = i + max(1, (j - i) // 2)
+        while k > floor and entries[j][0] - entries[k - 1][0] <= overlap_seconds:
+            k -= 1
+        i = k
+    return chunks
+
+
+def chunk_span(chunk_text: str) -> tuple:
+    """``(first, last)`` timestamp seconds of a chunk, or ``(None, None)``."""
+    times = [
+        seconds for seconds in map(timestamp_seconds, chunk_text.split("\n"))
+        if seconds is not None
+    ]
+    return (times[0], times[-1]) if times else (None, None)
+
+
+def merge_highlights(
+    highlights: list[dict],
+    spans: list[tuple] = None,
+    dedup_seconds: int = HIGHLIGHT_DEDUP_SECONDS,
+) -> list[dict]:
+    """Order highlights by time and drop same-type repeats from chunk overlaps.
+
+    Each highlight carries the index of its chunk under ``"chunk"`` and
+    ``spans`` holds the ``chunk_span`` of every chunk. A highlight is only a
+    repeat of one from another chunk that lies within ``dedup_seconds`` of it,
+    with both inside the stretch of transcript the two chunks share.
+    Highlights from the same chunk are always kept.
+    """
+    spans = spans or []
+    with_time = []
+    untimed = []
+    for highlight in highlights:
+        chunk = highlight.pop("chunk", None)
+        seconds = timestamp_seconds(highlight["timestamp"])
+        if seconds is None:
+            untimed.append(highlight)
+        else:
+            with_time.append((seconds, chunk, highlight))
+    with_time.sort(key=lambda item: item[0])
+
+    def overlap(a, b):
+        if a is None or b is None or a == b or max(a, b) >= len(spans):
+            return None
+        (start_a, end_a), (start_b, end_b) = spans[a], spans[b]
+        if None in (start_a, end_a, start_b, end_b):
+            return None
+        start, end = max(start_a, start_b), min(end_a, end_b)
+        return (start, end) if start <= end else None
+
+    def is_repeat(seconds, chunk, kind, kept_seconds, kept_chunk, kept_kind):
+        if kind != kept_kind or abs(seconds - kept_seconds) > dedup_seconds:
+            return False
+        window = overlap(chunk, kept_chunk)
+        return window is not None and all(
+            window[0] <= s <= window[1] for s in (seconds, kept_seconds)
+        )
+
+    merged = []
+    kept = []
+    for seconds, chunk, highlight in with_time:
+        kind = highlight["description"].split("-", 1)[0].strip().lower()
+        if any(is_repeat(seconds, chunk, kind, *other) for other in kept):
+            continue
+        kept.append((seconds, chunk, kind))
+        merged.append(highlight)
+    return merged + untimed
+
+
+async def _analyze_chunk(transcript_text: str, chunk_index: int = 0) -> list[dict]:
     prompt = (
         "You are analyzing a YouTube video transcript from a technical or educational video. "
         "Identify two types of important teaching moments:\n"
@@ -133,29 +330,85 @@ async def analyze_visual_segments(transcript_text: str) -> list[dict]:
         "For each, return a line in the format:\n"
         "<MM:SS> - <type: visual/text> - <short description of what's being explained or what visual would help>\n\n"
         "Don't add any commentary, headers, or extra formatting. Just the lines.\n\n"
-        f"Transcript:\n{transcript_text[:15000]}"
+        f"Transcript:\n{transcript_text}"
     )
 
-    try:
-        loop = asyncio.get_running_loop()
-        response = await loop.run_in_executor(
-            None, lambda: model.generate_content(prompt)
+    response = await llm.generate(prompt)
+
+    highlights = []
+    for line in response.text.strip().split("\n"):
+        if "-" in line:
+            parts = line.split("-", 1)
+            highlights.append(
+                {"timestamp": parts[0].strip(), "description": parts[1].strip(), "chunk": chunk_index}
+            )
+    return highlights
+
+
+@timed("transcript.analyze")
+async def analyze_visual_segments(transcript_text: str) -> list[dict]:
+    chunks = split_transcript(transcript_text)
+    logging.info(f"Sending to Gemini for analysis in {len(chunks)} chunk(s)")
+    semaphore = asyncio.Semaphore(ANALYSIS_CONCURRENCY)
+
+    async def analyze(chunk, index):
+        async with semaphore:
+            return await _analyze_chunk(chunk, index)
+
+    results = await asyncio.gather(
+        *(analyze(chunk, index) for index, chunk in enumerate(chunks)), return_exceptions=True
+    )
+
+    # A partial result would be cached as if complete; successful chunks are
+    # in the LLM response cache, so a retry only re-analyzes the failures
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        logging.error(
+            f"Failed to analyze {len(failures)} of {len(chunks)} transcript chunk(s): {failures[0]}"
         )
+        raise RuntimeError(f"Gemini visual analysis failed: {failures[0]}")
+
+    highlights = merge_highlights(
+        [h for r in results if not isinstance(r, Exception) for h in r],
+        [chunk_span(chunk) for chunk in chunks],
+    )
+    logging.info(f"Found {len(highlights)} visual highlight(s).")
+    return highlights
 
-        highlights = []
-        for line in response.text.strip().split("\n"):
-            if "-" in line:
-                parts = line.split("-", 1)
-                highlights.append(
-                    {"timestamp": parts[0].strip(), "description": parts[1].strip()}
-                )
 
-        logging.info(f"Found {len(highlights)} visual highlight(s).")
+async def get_transcript(video_id: str) -> tuple:
+    """Fetch ``(transcript_data, lang_code, needs_translation)`` through the transcript cache."""
+    transcript_key = transcript_cache.key(video_id)
+    cached_transcript = await transcript_cache.get(transcript_key)
+    if cached_transcript is not None:
+        logging.info(f"Transcript cache hit for video ID: {video_id}")
+        return tuple(cached_transcript)
+
+    transcript_data, lang_code, needs_translation = (
+        await fetch_transcript_with_language_fallback(video_id)
+    )
+    await transcript_cache.set(
+        transcript_key, [transcript_data, lang_code, needs_translation]
+    )
+    return transcript_data, lang_code, needs_translation
+
+
+async def get_highlights(video_id: str, transcript_data, lang_code, needs_translation) -> list[dict]:
+    """Analyze a fetched transcript for visual highlights through the highlights cache."""
+    highlights_key = highlights_cache.key(
+        video_id, lang_code, ANALYSIS_PROMPT_VERSION
+    )
+    highlights = await highlights_cache.get(highlights_key)
+    if highlights is not None:
+        logging.info(f"Highlights cache hit for video ID: {video_id}")
         return highlights
 
-    except Exception as e:
-        logging.exception("Failed to analyze visual segments.")
-        raise RuntimeError(f"Gemini visual analysis failed: {e}")
+    formatted_transcript = await format_transcript(
+        transcript_data, needs_translation, lang_code
+    )
+    highlights = await analyze_visual_segments(formatted_transcript)
+    await highlights_cache.set(highlights_key, highlights)
+    return highlights
 
 
 async def process_video(url: str) -> dict:
@@ -164,13 +417,8 @@ async def process_video(url: str) -> dict:
         video_id = extract_video_id(url)
         logging.info(f"Processing video ID: {video_id}")
 
-        transcript_data, lang_code, needs_translation = (
-            await fetch_transcript_with_language_fallback(video_id)
-        )
-        formatted_transcript = await format_transcript(
-            transcript_data, needs_translation, lang_code
-        )
-        highlights = await analyze_visual_segments(formatted_transcript)
+        transcript = await get_transcript(video_id)
+        highlights = await get_highlights(video_id, *transcript)
 
         result = {"video_id": video_id, "highlights": highlights}
         return result
@@ -0,0 +1,28 @@
+import json
+import threading
+
+# YoutubeDL is not thread-safe, so instances are reused per thread and options
+_local = threading.local()
+
+# Imported on first use, yt_dlp is slow to import
+YoutubeDL = None
+
+
+def get_youtube_dl(options: dict):
+    """Return this thread's YoutubeDL instance for ``options``, creating it once."""
+    global YoutubeDL
+    if YoutubeDL is None:
+        from yt_dlp import YoutubeDL
+    instances = getattr(_local, "instances", None)
+    if instances is None:
+        instances = _local.instances = {}
+    key = json.dumps(options, sort_keys=True, default=str)
+    ydl = instances.get(key)
+    if ydl is None:
+        ydl = instances[key] = YoutubeDL(options)
+    return ydl
+
+
+def extract_info(url: str, options: dict) -> dict:
+    """Extract info with a reused YoutubeDL instance (blocking)."""
+    return get_youtube_dl(options).extract_info(url, download=False)